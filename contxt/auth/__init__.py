@@ -2,7 +2,7 @@
 
 from abc import ABC, abstractmethod
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
 from jwt import decode
 
@@ -50,6 +50,11 @@ class TokenProvider(ABC):
             self.access_token
         return self._access_token_decoded  # type: ignore
 
+    @property
+    def principal(self) -> Tuple[Optional[str], str]:
+        """Gets who the access token is for, as its subject and audience"""
+        return self.decoded_access_token.get("sub"), self.audience
+
     def reset(self) -> None:
         self._access_token = None
         self._access_token_decoded = None
@@ -1,7 +1,7 @@
-from collections import defaultdict
 from datetime import datetime
+from itertools import islice
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Dict, Iterable, List, Optional
 
 import click
 
@@ -14,11 +14,14 @@ from contxt.cli.utils import (
     csv_callback,
     fields_option,
     print_table,
+    rows_progressbar,
     sort_option,
     warn,
 )
 from contxt.models.ems import MainService, ResourceType, UtilityStatement
 from contxt.models.iot import Window
+from contxt.services.pagination import DataPoint
+from contxt.utils.collections import merge_series
 from contxt.utils.serializer import Serializer
 
 
@@ -46,30 +49,47 @@ def mains(
 @click.option("--resource-type", type=ResourceType, default="electric", help="Resource type")
 @click.option("--start", type=click.DateTime(), help="Start time")
 @click.option("--end", type=click.DateTime(), help="End time")
+@click.option("--limit", type=int, default=1000, help="Maximum rows to print")
+@click.option(
+    "--output",
+    type=ClickPath(dir_okay=False, writable=True),
+    help="Path to write all rows to as csv, instead of printing them",
+)
 @click.pass_obj
 def main_data(
-    clients: Clients, facility_id: int, resource_type: ResourceType, start: datetime, end: datetime
+    clients: Clients,
+    facility_id: int,
+    resource_type: ResourceType,
+    start: datetime,
+    end: datetime,
+    limit: int,
+    output: Optional[Path],
 ) -> None:
     """Get main service data"""
-    data: Dict[datetime, Dict[str, Any]] = defaultdict(dict)
     services = clients.ems.get_main_services(facility_id=facility_id, resource_type=resource_type)
-    with click.progressbar(
-        services,
+    series = _main_service_series(clients, services, start=start, end=end)
+    rows = ({"timestamp": t, **row} for t, row in merge_series(series))
+    with rows_progressbar(
+        rows,
         label="Downloading main service data",
-        item_show_func=lambda s: f"Service {s.name}" if s else "",
-    ) as services_:
-        for service in services_:
-            for (t, v) in clients.iot.get_time_series_for_field(
-                field=service.usage_field,
-                start_time=start,
-                end_time=end,
-                window=Window.MINUTELY,
-                per_page=5000,
-            ):
-                data[t][service.usage_field.field_human_name] = v
+        start=start,
+        end=end,
+        window=Window.MINUTELY.value,
+    ) as rows_:
+        if output:
+            # Stream all rows to csv
+            count = Serializer.to_csv_rows(rows_, output, fieldnames=["timestamp", *series])
+        else:
+            # Only keep the rows to print (and one more, to know if there are others)
+            items = list(islice(rows_, limit + 1))
 
     # Dump
-    print_table(items=data)
+    if output:
+        print(f"Wrote {count} rows to {output}")
+    else:
+        print_table(items=items[:limit])
+        if len(items) > limit:
+            warn(f"Showing the first {limit} rows, use --output to write them all")
 
 
 @ems.command()
@@ -182,22 +202,32 @@ def export(
 
             # Main service data
             if "mains" in include:
-                data: Dict[datetime, Dict[str, Any]] = defaultdict(dict)
                 services = clients.ems.get_main_services(facility_id=facility.id)
-                for service in services:
-                    for (t, v) in clients.iot.get_time_series_for_field(
-                        field=service.usage_field,
-                        start_time=start,
-                        end_time=end,
-                        window=Window.MINUTELY,
-                        per_page=5000,
-                    ):
-                        data[t][service.usage_field.field_human_name] = v
-                Serializer.to_csv(data, fpath / "ems" / "main_service_usage.csv")
+                series = _main_service_series(clients, services, start=start, end=end)
+                rows = ({"timestamp": t, **row} for t, row in merge_series(series))
+                Serializer.to_csv_rows(
+                    rows, fpath / "ems" / "main_service_usage.csv", fieldnames=["timestamp", *series]
+                )
 
     print(f"Wrote data to {output}")
 
 
+def _main_service_series(
+    clients: Clients, services: Iterable[MainService], start: datetime, end: datetime
+) -> Dict[str, Iterable[DataPoint]]:
+    # NOTE: the series are only fetched (a page at a time) once iterated
+    return {
+        str(service.usage_field.field_human_name): clients.iot.get_time_series_for_field(
+            field=service.usage_field,
+            start_time=start,
+            end_time=end,
+            window=Window.MINUTELY,
+            per_page=5000,
+        )
+        for service in services
+    }
+
+
 def _download_bills(sis_api, facility_id, bills, output):
     # Build csv
     data = []
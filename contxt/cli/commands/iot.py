@@ -1,16 +1,24 @@
 import logging
-from collections import defaultdict
 from csv import DictReader, DictWriter
 from datetime import datetime
 from pathlib import Path
-from typing import IO, Any, Dict, List, Optional, cast
+from typing import IO, List, Optional, cast
 
 import click
 from requests import HTTPError
 
 from contxt.cli.clients import Clients
-from contxt.cli.utils import LAST_WEEK, NOW, ClickPath, fields_option, print_table, sort_option
+from contxt.cli.utils import (
+    LAST_WEEK,
+    NOW,
+    ClickPath,
+    fields_option,
+    print_table,
+    rows_progressbar,
+    sort_option,
+)
 from contxt.models.iot import Feed, Field, FieldGrouping, FieldValueType, Window
+from contxt.utils.collections import merge_series
 from contxt.utils.serializer import Serializer
 
 NEW_FIELD_ATTRS = ["field_descriptor", "label", "value_type", "units", "grouping"]
@@ -125,22 +133,19 @@ def data_get(
     fields = clients.iot.get_fields_for_feed(feed_id)
     print(f"Fetching iot data for {len(fields)} tags from {start} to {end}")
 
-    data: Dict[datetime, Dict[str, Any]] = defaultdict(dict)
-    with click.progressbar(
-        fields,
-        label="Downloading iot data",
-        item_show_func=lambda f: f"Field {f.field_human_name}" if f else "",
-    ) as fields_:
-        for field in fields_:
-            for (t, v) in clients.iot.get_time_series_for_field(
-                field=field, start_time=start, end_time=end, window=interval
-            ):
-                data[t][field.field_human_name] = v
-
-    # Output to csv
-    print(f"Writing data to {output}...")
-    flat_data = [{"timestamp": k, **v} for k, v in data.items()]
-    Serializer.to_csv(flat_data, output)
+    # Merge the fields' series into rows, written to csv as they are downloaded
+    series = {
+        field.field_human_name: clients.iot.get_time_series_for_field(
+            field=field, start_time=start, end_time=end, window=interval
+        )
+        for field in fields
+    }
+    rows = ({"timestamp": t, **row} for t, row in merge_series(series))
+    with rows_progressbar(
+        rows, label="Downloading iot data", start=start, end=end, window=interval.value
+    ) as rows_:
+        count = Serializer.to_csv_rows(rows_, output, fieldnames=["timestamp", *series])
+    print(f"Wrote {count} rows to {output}")
 
 
 @fields.command()
@@ -1,7 +1,7 @@
 from datetime import datetime, timedelta
 from functools import partial, reduce
 from pathlib import Path
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterable, List, Optional
 
 import click
 
@@ -34,6 +34,21 @@ def print_table(
         print(f"Count: {len(items)}")
 
 
+def rows_progressbar(
+    rows: Iterable[Dict[str, Any]],
+    label: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    window: int = 0,
+):
+    """Progress bar over timestamped `rows`, expecting one every `window` seconds from `start` to
+    `end` (if all are given)"""
+    length = int((end - start).total_seconds() // window) + 1 if start and end and window else None
+    return click.progressbar(
+        rows, length=length, label=label, item_show_func=lambda r: f"{r['timestamp']}" if r else ""
+    )
+
+
 def print_item(item: Dict[str, Any]) -> None:
     print_table([{"key": k, "value": v} for k, v in item.items()], count=False)
 
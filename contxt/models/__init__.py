@@ -1,5 +1,6 @@
 """Data models for API clients"""
 
+import re
 from abc import ABC, abstractmethod
 from ast import literal_eval
 from copy import deepcopy
@@ -10,11 +11,16 @@ from importlib import import_module
 from typing import Any, Callable, Dict, Optional, Tuple, Union
 
 from ..utils import make_logger
+from ..utils.datetime import datetime_zulu_parse
 from ..utils.serializer import Serializer
 
 logger = make_logger(__name__)
 
 
+_INT_LITERAL = re.compile(r"[+-]?(?:0|[1-9][0-9]*)")
+_FLOAT_LITERAL = re.compile(r"[+-]?(?:[0-9]+\.[0-9]*|\.[0-9]+|[0-9]+(?=[eE]))(?:[eE][+-]?[0-9]+)?")
+
+
 class Parsers:
     """Parsers to deserialize JSON as Python"""
 
@@ -28,11 +34,19 @@ class Parsers:
 
     @staticmethod
     def datetime(timestamp: str) -> _datetime:
-        return _datetime.strptime(timestamp, "%Y-%m-%dT%H:%M:%S.%fZ").replace(tzinfo=timezone.utc)
+        return datetime_zulu_parse(timestamp)
 
     @staticmethod
     def unknown(value: Any) -> Any:
-        # First, try a general parser (supports strings, numbers, tuples,
+        # Fast path for numbers, and strings of the number literals `literal_eval` accepts
+        if isinstance(value, (int, float)):
+            return value
+        if isinstance(value, str):
+            if _INT_LITERAL.fullmatch(value):
+                return int(value)
+            if _FLOAT_LITERAL.fullmatch(value):
+                return float(value)
+        # Next, try a general parser (supports strings, numbers, tuples,
         # lists, dicts, booleans (True/False strings only), and None)
         try:
             return literal_eval(value)
@@ -2,7 +2,7 @@ from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
 from json import loads
-from typing import Any, ClassVar, Dict, List, Optional
+from typing import Any, Callable, ClassVar, Dict, List, Optional, Tuple
 
 from requests import Request
 
@@ -175,6 +175,50 @@ class Feed(ApiObject):
     metrics: Optional[Dict] = None
 
 
+def _parse_numeric(value: Any) -> Optional[float]:
+    if value is None or isinstance(value, (int, float)):
+        return value
+    return float(value)
+
+
+def _parse_boolean(value: Any) -> Optional[bool]:
+    if value is None or isinstance(value, bool):
+        return value
+    text = str(value).lower()
+    if text in ("true", "yes", "1"):
+        return True
+    elif text in ("false", "no", "0"):
+        return False
+    raise ValueError(f"Invalid boolean value {value!r}")
+
+
+def _parse_string(value: Any) -> Optional[str]:
+    return value if value is None else str(value)
+
+
+_VALUE_PARSERS = {
+    FieldValueType.BOOLEAN: _parse_boolean,
+    FieldValueType.NUMERIC: _parse_numeric,
+    FieldValueType.STRING: _parse_string,
+}
+
+
+def value_parser(value_type: Optional[FieldValueType] = None) -> Callable[[Any], Any]:
+    """Get the parser of time series values of type `value_type`, which is strict
+    (raising a `ValueError`) if specified, and otherwise infers the type"""
+    return _VALUE_PARSERS[value_type] if value_type else Parsers.unknown
+
+
+def parse_time_series(
+    records: List[Dict[str, Any]], value_type: Optional[FieldValueType] = None
+) -> List[Tuple[datetime, Any]]:
+    """Parse the `event_time` and `value` of a page of time series `records`. If
+    `value_type` is specified, values are strictly parsed as that type, raising a
+    `ValueError` if they are not. Otherwise, their type is inferred."""
+    parse_time, parse_value = Parsers.datetime, value_parser(value_type)
+    return [(parse_time(r["event_time"]), parse_value(r["value"])) for r in records]
+
+
 @dataclass
 class FieldTimeSeries:
     field: Field
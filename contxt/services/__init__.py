@@ -1,7 +1,8 @@
 """API clients"""
 
 # flake8: noqa
-from .assets import AssetsService
+from .assets import AssetsService, AsyncAssetsService
+from .async_api import AsyncApi, AsyncConfiguredApi
 from .auth import AuthService
 from .bus import MessageBusService
 from .contxt import ContxtService
@@ -10,6 +11,6 @@ from .ems import EmsService
 from .events import EventsService
 from .facilities import FacilitiesService
 from .health import HealthService
-from .iot import IotDataService, IotService
+from .iot import AsyncIotService, IotDataService, IotService
 from .ngest import NgestService
 from .sis import SisService
@@ -1,6 +1,24 @@
+import random
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
-from typing import Dict, FrozenSet, Optional, Tuple
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import (
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    FrozenSet,
+    Generator,
+    Iterable,
+    List,
+    Optional,
+    Sized,
+    Tuple,
+    Union,
+)
+from urllib.parse import urlsplit
 
 import requests
 from requests import PreparedRequest, Response, Session
@@ -11,12 +29,21 @@ from urllib3.util.retry import Retry
 
 from ..auth import Auth, TokenProvider
 from ..utils import make_logger
+from ..utils.json_codec import JsonCodec, default_codec
+from ..utils.json_stream import JsonRecordStream
+from .cache import ResponseCache
+from .circuit_breaker import CircuitBreaker, CircuitBreakerRegistry
+from .instrumentation import LoggingListener, RequestEvent, RequestListener, endpoint_template
+from .single_flight import in_flight
 
 logger = make_logger(__name__)
 
 # NOTE: support breaking change in urllib3: https://github.com/urllib3/urllib3/issues/2092
 RETRY_METHODS_PARM = "allowed_methods" if hasattr(Retry(), "allowed_methods") else "method_whitelist"
 
+# Bytes read from the socket at a time, when streaming responses
+STREAM_CHUNK_SIZE = 64 * 1024
+
 
 class BearerTokenAuth(AuthBase):
     """Bearer token to authorize requests"""
@@ -29,20 +56,39 @@ class BearerTokenAuth(AuthBase):
         return request
 
 
+IDEMPOTENT_METHODS = frozenset(["DELETE", "GET", "HEAD", "OPTIONS", "PUT", "TRACE"])
+NON_IDEMPOTENT_METHODS = frozenset(["PATCH", "POST"])
+
+
 class ApiRetry(Retry):
+    """Retries failed requests with jittered exponential backoff.
+
+    Only idempotent methods are retried after a failure (i.e. a 5xx response or a
+    read error), unless `retry_non_idempotent` is set, since the server may have
+    already acted on the request. Requests rejected with a `REJECTED_STATUS_CODES`
+    status (429) were never processed, so they are retried whatever the method.
+    `Retry-After` headers are honored, and each backoff is stretched by a random
+    factor of up to `jitter`, so that clients do not retry in lockstep.
+    """
+
+    REJECTED_STATUS_CODES = frozenset([429])
+
     def __init__(
         self,
         total: int = 3,
         backoff_factor: float = 0.1,
-        method_whitelist: FrozenSet = frozenset(
-            # NOTE: be careful as some of these methods are not idempotent
-            ["DELETE", "GET", "OPTIONS", "POST", "PUT", "TRACE", "HEAD"]
-        ),
-        status_forcelist: Tuple[int, ...] = (500, 502, 504),
+        method_whitelist: FrozenSet = IDEMPOTENT_METHODS,
+        status_forcelist: Tuple[int, ...] = (429, 500, 502, 503, 504),
         raise_on_status: bool = False,
+        jitter: float = 0.5,
+        retry_non_idempotent: bool = False,
         **kwargs,
     ) -> None:
-        kwargs[RETRY_METHODS_PARM] = method_whitelist
+        if retry_non_idempotent:
+            method_whitelist = method_whitelist | NON_IDEMPOTENT_METHODS
+        # NOTE: `new()` passes the methods on under their urllib3 name
+        kwargs.setdefault(RETRY_METHODS_PARM, method_whitelist)
+        self.jitter = jitter
         super().__init__(
             total=total,
             backoff_factor=backoff_factor,
@@ -51,12 +97,178 @@ class ApiRetry(Retry):
             **kwargs,
         )
 
+    def new(self, **kwargs) -> "ApiRetry":
+        kwargs.setdefault("jitter", self.jitter)
+        return super().new(**kwargs)  # type: ignore
+
+    def is_retry(self, method: str, status_code: int, has_retry_after: bool = False) -> bool:
+        if status_code in self.REJECTED_STATUS_CODES and status_code in (self.status_forcelist or ()):
+            return bool(self.total)
+        return super().is_retry(method, status_code, has_retry_after)
+
+    def get_backoff_time(self) -> float:
+        backoff = super().get_backoff_time()
+        return backoff * (1 + random.uniform(0, self.jitter))
+
+
+@dataclass
+class ApiCall:
+    """A single request for `Api.map`. If given, `parser` is applied to the
+    response's json on the worker thread. If `sized` (for a GET), the result is
+    the (parsed) json along with the size of the response body, as by `Api.get_sized`."""
+
+    method: str
+    uri: str
+    params: Optional[Dict] = None
+    data: Optional[Dict] = None
+    json: Optional[Any] = None
+    parser: Optional[Callable[[Any], Any]] = None
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+    sized: bool = False
+
+
+@dataclass
+class ApiResult:
+    """The outcome of an `ApiCall`: either its (parsed) `value` or its `error`"""
+
+    call: ApiCall
+    value: Any = None
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def result(self) -> Any:
+        """Returns the value, or raises the error"""
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class ApiResultsError(IOError):
+    """Raised when some of a batch of `ApiCall`s failed, with the `results` of
+    every call, so that those that succeeded (and were applied) are known"""
+
+    def __init__(self, results: List[ApiResult]) -> None:
+        failed = [result for result in results if not result.ok]
+        super().__init__(f"{len(failed)} of {len(results)} calls failed, first with {failed[0].error!r}")
+        self.results = results
+
+    @property
+    def values(self) -> List[Any]:
+        """The values of the calls that succeeded"""
+        return [result.value for result in self.results if result.ok]
+
+
+def gather(results: Iterable[ApiResult]) -> List[Any]:
+    """Get the values of all `results`, such as those of `Api.map`. Once all calls
+    are done, raises `ApiResultsError` if any failed."""
+    done = list(results)
+    errors = [result.error for result in done if not result.ok]
+    if errors:
+        raise ApiResultsError(done) from errors[0]
+    return [result.value for result in done]
+
+
+class AdapterRegistry:
+    """Process-wide registry of `HTTPAdapter`s, and hence urllib3 connection pools,
+    keyed by host and pool configuration. Sessions for the same host mount the same
+    adapter, so they reuse each other's warm (TLS) connections."""
+
+    _adapters: Dict[Tuple[Any, ...], HTTPAdapter] = {}
+    _lock = Lock()
+
+    @classmethod
+    def get(
+        cls,
+        host: str,
+        retry: Optional[Retry] = None,
+        pool_connections: int = 10,
+        pool_maxsize: int = 32,
+        pool_block: bool = False,
+    ) -> HTTPAdapter:
+        """Get the shared adapter for `host`, creating it if needed"""
+        key = (host, cls._retry_key(retry), pool_connections, pool_maxsize, pool_block)
+        with cls._lock:
+            if key not in cls._adapters:
+                cls._adapters[key] = cls.create(host, retry, pool_connections, pool_maxsize, pool_block)
+            return cls._adapters[key]
+
+    @staticmethod
+    def _retry_key(retry: Optional[Retry]) -> Optional[Tuple[Any, ...]]:
+        # Key on the retry's configuration, so that equal policies share an adapter
+        if retry is None:
+            return None
+        methods = getattr(retry, RETRY_METHODS_PARM)
+        return (
+            type(retry),
+            retry.total,
+            retry.connect,
+            retry.read,
+            retry.status,
+            retry.redirect,
+            retry.backoff_factor,
+            frozenset(retry.status_forcelist or ()),
+            frozenset(methods) if methods else methods,
+            retry.raise_on_status,
+            retry.respect_retry_after_header,
+            getattr(retry, "jitter", None),
+        )
+
+    @staticmethod
+    def create(
+        host: str,
+        retry: Optional[Retry] = None,
+        pool_connections: int = 10,
+        pool_maxsize: int = 32,
+        pool_block: bool = False,
+    ) -> HTTPAdapter:
+        """Create a private (unshared) adapter"""
+        return HTTPAdapter(
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            max_retries=retry or 0,
+            pool_block=pool_block,
+        )
+
+    @classmethod
+    def clear(cls) -> None:
+        """Close and forget all shared adapters"""
+        with cls._lock:
+            for adapter in cls._adapters.values():
+                adapter.close()
+            cls._adapters.clear()
+
 
 class Api:
     """An API with url `base_url`.
 
     If `token_provider` is specified, all requests will be authenticated with
     the access token it provides.
+
+    Connection pools are shared between all instances with the same host and pool
+    settings (see `AdapterRegistry`). `pool_connections` is the number of pools to
+    cache, `pool_maxsize` the number of connections kept per pool, and `pool_block`
+    whether to wait for a free connection instead of opening (and later discarding)
+    a new one when the pool is exhausted. Set `share_pool` to `False` for a private pool.
+
+    Requests to a host that keeps failing fail fast with `CircuitOpenError`, while its
+    shared `CircuitBreaker` is open. Set `circuit_breaker` to `False` to disable this,
+    or to a `CircuitBreaker` with other settings (shared between instances if from
+    `CircuitBreakerRegistry.get`) to use it instead.
+
+    Each request is reported as a `RequestEvent` to `listeners` (by default, a
+    debug `LoggingListener`). Events are only built while a listener is enabled.
+
+    JSON bodies are encoded and decoded with `codec`, by default the fastest one
+    installed (see `default_codec`). Bytes passed as `json` are sent as is.
+
+    If `cache` is specified, GET responses are cached in it (see `ResponseCache`),
+    and entries for a resource are invalidated by any other request to it.
+
+    If `coalesce` is set, concurrent identical GET requests (by url, params, and
+    principal) from any instance share a single request and its parsed response.
     """
 
     def __init__(
@@ -64,29 +276,95 @@ class Api:
         base_url: str,
         token_provider: Optional[TokenProvider] = None,
         retry: Optional[ApiRetry] = ApiRetry(),
+        pool_connections: int = 10,
+        pool_maxsize: int = 32,
+        pool_block: bool = False,
+        share_pool: bool = True,
+        listeners: Optional[List[RequestListener]] = None,
+        codec: Optional[JsonCodec] = None,
+        circuit_breaker: Union[bool, CircuitBreaker] = True,
+        cache: Optional[ResponseCache] = None,
+        coalesce: bool = False,
     ) -> None:
         self.base_url = base_url if base_url.endswith("/") else f"{base_url}/"
+        self.codec = codec or default_codec()
+        self.cache = cache
+        self.coalesce = coalesce
+        self.token_provider = token_provider
+        host = urlsplit(self.base_url).netloc
+        self.circuit_breaker = CircuitBreakerRegistry.resolve(host, circuit_breaker)
+        self.pool_maxsize = pool_maxsize
+        self.listeners: List[RequestListener] = (
+            [LoggingListener(logger)] if listeners is None else list(listeners)
+        )
 
         # Initialize session
         self.session = Session()
         self.session.auth = BearerTokenAuth(token_provider) if token_provider else None
         self.session.headers.update({"Cache-Control": "no-cache"})
-        self.session.hooks = {"response": self._log_response}  # type: ignore
+        self.session.hooks = {"response": self._instrument}  # type: ignore
 
-        # Attach retry adapter
-        if retry:
-            adapter = HTTPAdapter(max_retries=retry)
-            self.session.mount("http://", adapter)
-            self.session.mount("https://", adapter)
+        # Attach (shared) pooling and retry adapter
+        get_adapter = AdapterRegistry.get if share_pool else AdapterRegistry.create
+        adapter = get_adapter(host, retry, pool_connections, pool_maxsize, pool_block)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
 
     def _url(self, uri: str) -> str:
         return f"{self.base_url}{uri}"
 
-    def _log_response(self, response: Response, *args, **kwargs) -> None:
-        t = response.elapsed.total_seconds()
-        logger.debug(
-            f"Called {response.request.method} {response.url} with body"  # type: ignore
-            f" {response.request.body} ({t} s)"
+    def _principal(self) -> Optional[Tuple[Optional[str], str]]:
+        # NOTE: read per request, since the token's identity may change (e.g. on a new login)
+        return self.token_provider.principal if self.token_provider else None
+
+    def _send(self, method: str, uri: str, **kwargs) -> Response:
+        breaker = self.circuit_breaker
+        if breaker is None:
+            return self.session.request(method=method, url=self._url(uri), **kwargs)
+        breaker.before_request()
+        try:
+            response = self.session.request(method=method, url=self._url(uri), **kwargs)
+        except BaseException:
+            # NOTE: any error (e.g. from the token provider) also ends a half-open trial
+            breaker.record_failure()
+            raise
+        breaker.record_status(response.status_code)
+        return response
+
+    def add_listener(self, listener: RequestListener) -> None:
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener: RequestListener) -> None:
+        self.listeners.remove(listener)
+
+    def _instrument(self, response: Response, *args, stream: bool = False, **kwargs) -> None:
+        listeners = [listener for listener in self.listeners if listener.enabled()]
+        if not listeners:
+            return
+        event = self._request_event(response, stream=stream)
+        for listener in listeners:
+            listener.on_request(event)
+
+    def _request_event(self, response: Response, stream: bool = False) -> RequestEvent:
+        request = response.request
+        body = request.body
+        retries = getattr(response.raw, "retries", None)
+        if not stream:
+            # NOTE: the body is about to be read anyway
+            response_bytes: Optional[int] = len(response.content)
+        elif "Content-Length" in response.headers:
+            response_bytes = int(response.headers["Content-Length"])
+        else:
+            response_bytes = None
+        return RequestEvent(
+            method=request.method,  # type: ignore
+            endpoint=endpoint_template(response.url.replace(self.base_url, "")),
+            url=response.url,
+            status=response.status_code,
+            elapsed=response.elapsed.total_seconds(),
+            request_bytes=len(body) if isinstance(body, (str, bytes)) else 0,
+            response_bytes=response_bytes,
+            retries=len(retries.history) if retries else 0,
         )
 
     def _process_response(self, response: Response) -> Dict:
@@ -106,35 +384,172 @@ class Api:
 
     def _get_json(self, response: Response) -> Dict:
         try:
-            return response.json()
+            return self.codec.loads(response.content)
         except ValueError:
             return {}
 
+    def _encode_json(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        # NOTE: like requests, `json` is ignored if `data` is given
+        body = kwargs.pop("json", None)
+        if body is not None and not kwargs.get("data"):
+            kwargs["data"] = self.codec.dumps(body)
+            kwargs["headers"] = {"Content-Type": "application/json", **(kwargs.get("headers") or {})}
+        return kwargs
+
+    def request(self, method: str, uri: str, **kwargs) -> Dict:
+        """Sends a `method` request"""
+        params = kwargs.get("params")
+        if (
+            self.coalesce
+            and method.upper() == "GET"
+            and all(v is None for k, v in kwargs.items() if k != "params")
+        ):
+            key = ResponseCache.key(self._url(uri), params, self._principal())
+            return in_flight.do(key, lambda: self._request(method, uri, params=params))
+        return self._request(method, uri, **kwargs)
+
+    def _request(self, method: str, uri: str, **kwargs) -> Dict:
+        if self.cache is None:
+            response = self._send(method, uri, **self._encode_json(kwargs))
+        elif method.upper() == "GET":
+            return self._cached_get(self.cache, uri, **kwargs)
+        else:
+            try:
+                response = self._send(method, uri, **self._encode_json(kwargs))
+            finally:
+                # NOTE: invalidate once the mutation is done, so that no concurrent
+                # GET caches the state from before it
+                self.cache.invalidate(self._url(uri))
+        return self._process_response(response)
+
+    def _cached_get(
+        self, cache: ResponseCache, uri: str, params: Optional[Dict] = None, **kwargs
+    ) -> Dict:
+        key = cache.key(self._url(uri), params, self._principal())
+        entry = cache.get(key)
+        if entry is not None and entry.fresh:
+            return entry.value
+
+        # Revalidate a stale entry, if the server gave us validators
+        headers = {**(entry.validators() if entry else {}), **(kwargs.pop("headers", None) or {})}
+        response = self._send("GET", uri, params=params, headers=headers, **kwargs)
+        if entry is not None and response.status_code == 304:
+            cache.refresh(key, entry, ttl=cache.ttl_for(uri))
+            return entry.value
+        value = self._process_response(response)
+        if "no-store" not in response.headers.get("Cache-Control", ""):
+            cache.set(
+                key,
+                value,
+                ttl=cache.ttl_for(uri),
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+            )
+        return value
+
     def get(self, uri: str, params: Optional[Dict] = None, **kwargs) -> Dict:
         """Sends a GET request"""
-        response = self.session.get(url=self._url(uri), params=params, **kwargs)
-        return self._process_response(response)
+        return self.request("GET", uri, params=params, **kwargs)
+
+    def get_sized(self, uri: str, params: Optional[Dict] = None, **kwargs) -> Tuple[Dict, int]:
+        """Sends a GET request, and returns its json along with the size of the response
+        body in bytes. The response cache is bypassed, since it does not hold sizes."""
+        response = self._send("GET", uri, params=params, **kwargs)
+        return self._process_response(response), len(response.content)
+
+    def get_stream(
+        self, uri: str, params: Optional[Dict] = None, key: str = "records", **kwargs
+    ) -> JsonRecordStream:
+        """Sends a GET request and incrementally decodes the items of the response's
+        array `key`, as they arrive. The remaining members are in the stream's `metadata`."""
+        response = self._send("GET", uri, params=params, stream=True, **kwargs)
+        if not response.ok:
+            # Read the body, and raise
+            with response:
+                self._process_response(response)
+        return JsonRecordStream(
+            response.iter_content(chunk_size=STREAM_CHUNK_SIZE), key=key, on_close=response.close
+        )
 
     def raw_post(
         self, uri: str, data: Optional[Dict] = None, json: Optional[Dict] = None, **kwargs
     ) -> requests.Response:
         """Sends a POST request without processing response"""
-        return self.session.post(url=self._url(uri), data=data, json=json, **kwargs)
+        try:
+            return self._send("POST", uri, **self._encode_json(dict(data=data, json=json, **kwargs)))
+        finally:
+            if self.cache is not None:
+                self.cache.invalidate(self._url(uri))
 
     def post(self, uri: str, data: Optional[Dict] = None, json: Optional[Dict] = None, **kwargs) -> Dict:
         """Sends a POST request"""
-        response = self.session.post(url=self._url(uri), data=data, json=json, **kwargs)
-        return self._process_response(response)
+        return self.request("POST", uri, data=data, json=json, **kwargs)
 
     def put(self, uri: str, data: Optional[Dict] = None, json: Optional[Dict] = None, **kwargs) -> Dict:
         """Sends a PUT request"""
-        response = self.session.put(url=self._url(uri), data=data, json=json, **kwargs)
-        return self._process_response(response)
+        return self.request("PUT", uri, data=data, json=json, **kwargs)
 
     def delete(self, uri: str, **kwargs) -> Dict:
         """Sends a DELETE request"""
-        response = self.session.delete(url=self._url(uri), **kwargs)
-        return self._process_response(response)
+        return self.request("DELETE", uri, **kwargs)
+
+    def execute(self, call: ApiCall) -> Any:
+        """Sends a single `call`, and returns its (parsed) response"""
+        if call.sized:
+            assert call.method.upper() == "GET", f"Only GET calls can be sized, not {call.method}"
+            resp, nbytes = self.get_sized(call.uri, params=call.params, **call.kwargs)
+            return (call.parser(resp) if call.parser else resp), nbytes
+        resp = self.request(
+            call.method, call.uri, params=call.params, data=call.data, json=call.json, **call.kwargs
+        )
+        return call.parser(resp) if call.parser else resp
+
+    def _execute(self, call: ApiCall) -> ApiResult:
+        try:
+            return ApiResult(call=call, value=self.execute(call))
+        except Exception as e:
+            return ApiResult(call=call, error=e)
+
+    def map(
+        self, calls: Iterable[ApiCall], max_workers: Optional[int] = None, ordered: bool = True
+    ) -> Generator[ApiResult, None, None]:
+        """Sends `calls` concurrently over a pool of `max_workers` threads (defaults
+        to `pool_maxsize`, so that every worker can hold a pooled connection, and
+        capped by the number of calls, if known).
+
+        Yields one `ApiResult` per call, either in the order of `calls` or as they
+        complete. Errors are captured per call rather than raised. At most
+        `2 * max_workers` calls are submitted ahead of the consumer.
+        """
+        max_workers = max_workers or self.pool_maxsize
+        if isinstance(calls, Sized):
+            if not calls:
+                return
+            max_workers = min(max_workers, len(calls))
+        calls = iter(calls)
+        pending: Deque[Future] = deque()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            try:
+                while True:
+                    # Top up submitted calls
+                    for call in calls:
+                        pending.append(executor.submit(self._execute, call))
+                        if len(pending) >= 2 * max_workers:
+                            break
+                    if not pending:
+                        return
+
+                    # Yield next result
+                    if ordered:
+                        yield pending.popleft().result()
+                    else:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            pending.remove(future)
+                            yield future.result()
+            finally:
+                for future in pending:
+                    future.cancel()
 
 
 @dataclass
@@ -149,21 +564,18 @@ class ApiEnvironment:
     client_id: str
 
 
-class ConfiguredApi(Api, ABC):
-    """An `Api` configured for multiple environments, such as staging and production.
-    Available environments are expressed by `_envs` and the desired environment is
-    specified by its name `env`.
-
-    Overload this class to implement `_envs`.
-    """
+class ApiEnvironments(ABC):
+    """Environments of an API, such as staging and production, expressed by `_envs`.
+    Shared by `ConfiguredApi` and `AsyncConfiguredApi`."""
 
-    def __init__(self, env: str, auth: Optional[Auth] = None, **kwargs) -> None:
+    def _configure(self, env: str, auth: Optional[Auth]) -> Tuple[str, Optional[TokenProvider]]:
+        """Select environment with name `env`, and get its base url and token provider"""
         # TODO: figure out a cleaner approach to environment selection
         api_env = self._get_env(env)
         self.env = env
         self.client_id = api_env.client_id
         token_provider = auth.get_token_provider(self.client_id) if auth else None
-        super().__init__(base_url=api_env.base_url, token_provider=token_provider, **kwargs)
+        return api_env.base_url, token_provider
 
     @classmethod
     def _get_env(cls, name: str) -> ApiEnvironment:
@@ -179,3 +591,16 @@ class ConfiguredApi(Api, ABC):
     def _envs(cls) -> Tuple[ApiEnvironment, ...]:
         """Lists available environments."""
         pass
+
+
+class ConfiguredApi(ApiEnvironments, Api):
+    """An `Api` configured for multiple environments, such as staging and production.
+    Available environments are expressed by `_envs` and the desired environment is
+    specified by its name `env`.
+
+    Overload this class to implement `_envs`.
+    """
+
+    def __init__(self, env: str, auth: Optional[Auth] = None, **kwargs) -> None:
+        base_url, token_provider = self._configure(env, auth)
+        super().__init__(base_url=base_url, token_provider=token_provider, **kwargs)
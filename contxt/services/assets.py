@@ -10,8 +10,9 @@ from ..models.assets import (
     Metric,
     MetricValue,
 )
-from .api import ApiEnvironment, ConfiguredApi
-from .pagination import PagedRecords, PageOptions
+from .api import ApiCall, ApiEnvironment, ConfiguredApi, gather
+from .async_api import AsyncConfiguredApi
+from .pagination import AsyncPagedRecords, PagedRecords, PageOptions
 
 
 class AssetsService(ConfiguredApi):
@@ -164,28 +165,39 @@ class AssetsService(ConfiguredApi):
 
     # Single asset types
     def create_asset_type(self, asset_type: AssetType) -> AssetType:
-        data = asset_type.post()
-        resp = self.post("assets/types", data=data)
-        new_asset_type = AssetType.from_api(resp)
+        new_asset_type = self.execute(self._create_asset_type_call(asset_type))
         self._cache_asset_type(new_asset_type)
         return new_asset_type
 
+    def _create_asset_type_call(self, asset_type: AssetType) -> ApiCall:
+        return ApiCall("POST", "assets/types", data=asset_type.post(), parser=AssetType.from_api)
+
     def get_asset_type(self, asset_type_id: str) -> AssetType:
         resp = self.get(f"assets/types/{asset_type_id}")
         return AssetType.from_api(resp)
 
     def update_asset_type(self, asset_type: AssetType) -> None:
-        data = asset_type.put()
-        self.put(f"assets/types/{asset_type.id}", data=data)
+        self.execute(self._update_asset_type_call(asset_type))
+
+    def _update_asset_type_call(self, asset_type: AssetType) -> ApiCall:
+        return ApiCall("PUT", f"assets/types/{asset_type.id}", data=asset_type.put())
 
     def delete_asset_type(self, asset_type: AssetType) -> None:
-        self.delete(f"assets/types/{asset_type.id}")
+        self.execute(self._delete_asset_type_call(asset_type))
         self._uncache_asset_type(asset_type)
 
+    def _delete_asset_type_call(self, asset_type: AssetType) -> ApiCall:
+        return ApiCall("DELETE", f"assets/types/{asset_type.id}")
+
     # Batch asset types
+    # NOTE: each batch method sends all its calls, and updates the local caches for
+    # those that succeeded, before raising `ApiResultsError` for any that failed
     def create_asset_types(self, asset_types: List[AssetType]) -> List[AssetType]:
-        # TODO: batch create
-        return [self.create_asset_type(asset_type) for asset_type in asset_types]
+        results = list(self.map([self._create_asset_type_call(t) for t in asset_types]))
+        for result in results:
+            if result.ok:
+                self._cache_asset_type(result.value)
+        return gather(results)
 
     def get_asset_types(
         self, organization_id: Optional[str] = None, page_options: Optional[PageOptions] = None
@@ -194,32 +206,35 @@ class AssetsService(ConfiguredApi):
         return PagedRecords(api=self, url=url, options=page_options, record_parser=AssetType.from_api)
 
     def update_asset_types(self, asset_types: List[AssetType]) -> None:
-        # TODO: batch update
-        for asset_type in asset_types:
-            self.update_asset_type(asset_type)
+        gather(self.map([self._update_asset_type_call(t) for t in asset_types]))
 
     def delete_asset_types(self, asset_types: List[AssetType]) -> None:
-        # TODO: batch delete
-        for asset_type in asset_types:
-            self.delete_asset_type(asset_type)
+        results = list(self.map([self._delete_asset_type_call(t) for t in asset_types]))
+        for asset_type, result in zip(asset_types, results):
+            if result.ok:
+                self._uncache_asset_type(asset_type)
+        gather(results)
 
     # Single asset
     def create_asset(self, asset: Asset) -> Asset:
-        data = asset.post()
-        params = {"with_attribute_values": str(bool(asset.attribute_values)).lower()}
         # Create asset with attribute_values, if present
-        resp = self.post("assets", params=params, json=data)
-        new_asset = Asset.from_api(resp)
+        new_asset = self.execute(self._create_asset_call(asset))
+        return self._create_asset_dependents(asset, new_asset)
+
+    def _create_asset_call(self, asset: Asset) -> ApiCall:
+        params = {"with_attribute_values": str(bool(asset.attribute_values)).lower()}
+        return ApiCall("POST", "assets", params=params, json=asset.post(), parser=Asset.from_api)
 
+    def _create_asset_dependents(self, asset: Asset, new_asset: Asset) -> Asset:
         # Fetch attribute_values, if posted (needed because response does not
         # contain them)
         if asset.attribute_values:
-            new_asset.attribute_values = self.get_attribute_values(new_asset.id)
+            new_asset.attribute_values = self.get_attribute_values(new_asset.id)  # type: ignore
 
         # Create metric_values, if present
         if asset.metric_values:
             for metric_value in asset.metric_values:
-                metric_value.asset_id = new_asset.id
+                metric_value.asset_id = new_asset.id  # type: ignore
             new_asset.metric_values = self.create_metric_values(asset.metric_values)
 
         # Create children, if present
@@ -248,10 +263,11 @@ class AssetsService(ConfiguredApi):
         with_metric_values: bool = False,
     ) -> Optional[Asset]:
         asset_type_id = self.asset_type_with_label(asset_type_label).id if asset_type_label else None
-        for asset in self.get_assets(asset_type_id=asset_type_id):
-            if asset.label.upper() == asset_label.upper():
+        # NOTE: only the matching record is parsed
+        for record in self.get_assets(asset_type_id=asset_type_id).iter_raw():
+            if record["label"].upper() == asset_label.upper():
                 return self._build_asset(
-                    asset,
+                    Asset.from_api(record),
                     with_attribute_values=with_attribute_values,
                     with_metric_values=with_metric_values,
                 )
@@ -265,26 +281,39 @@ class AssetsService(ConfiguredApi):
         with_metric_values: bool = False,
     ) -> Optional[Asset]:
         asset_type_id = self.asset_type_with_label(asset_type_label).id if asset_type_label else None
-        for asset in self.get_assets_for_organization(asset_type_id=asset_type_id):
-            if asset.label.upper() == asset_label.upper():
+        # NOTE: only the matching record is parsed
+        for record in self.get_assets_for_organization(asset_type_id=asset_type_id).iter_raw():
+            if record["label"].upper() == asset_label.upper():
                 return self._build_asset(
-                    asset,
+                    Asset.from_api(record),
                     with_attribute_values=with_attribute_values,
                     with_metric_values=with_metric_values,
                 )
         return None
 
     def update_asset(self, asset: Asset) -> None:
-        data = asset.put()
-        self.put(f"assets/{asset.id}", data=data)
+        self.execute(self._update_asset_call(asset))
+
+    def _update_asset_call(self, asset: Asset) -> ApiCall:
+        return ApiCall("PUT", f"assets/{asset.id}", data=asset.put())
 
     def delete_asset(self, asset: Asset) -> None:
-        self.delete(f"assets/{asset.id}")
+        self.execute(self._delete_asset_call(asset))
+
+    def _delete_asset_call(self, asset: Asset) -> ApiCall:
+        return ApiCall("DELETE", f"assets/{asset.id}")
 
     # Batch assets
     def create_assets(self, assets: List[Asset]) -> List[Asset]:
-        # TODO: batch create
-        return [self.create_asset(asset) for asset in assets]
+        results = list(self.map([self._create_asset_call(asset) for asset in assets]))
+        for asset, result in zip(assets, results):
+            if result.ok:
+                try:
+                    result.value = self._create_asset_dependents(asset, result.value)
+                except Exception as e:
+                    # NOTE: the asset itself was still created, and is kept as the value
+                    result.error = e
+        return gather(results)
 
     def get_assets(
         self,
@@ -292,7 +321,7 @@ class AssetsService(ConfiguredApi):
         with_attribute_values: bool = False,
         with_metric_values: bool = False,
         page_options: Optional[PageOptions] = None,
-    ) -> Iterable[Asset]:
+    ) -> PagedRecords[Asset]:
         def _build_asset(record: Dict) -> Asset:
             return self._build_asset(
                 Asset.from_api(record),
@@ -317,7 +346,7 @@ class AssetsService(ConfiguredApi):
         with_attribute_values: bool = False,
         with_metric_values: bool = False,
         page_options: Optional[PageOptions] = None,
-    ) -> Iterable[Asset]:
+    ) -> PagedRecords[Asset]:
         # BUG: this endpoint returns globals when type_id is None
         organization_id = organization_id or self.organization_id
 
@@ -341,36 +370,42 @@ class AssetsService(ConfiguredApi):
         )
 
     def update_assets(self, assets: List[Asset]) -> None:
-        # TODO: batch update
-        for asset in assets:
-            self.update_asset(asset)
+        gather(self.map([self._update_asset_call(asset) for asset in assets]))
 
     def delete_assets(self, assets: List[Asset]) -> None:
-        # TODO: batch delete
-        for asset in assets:
-            self.delete_asset(asset)
+        gather(self.map([self._delete_asset_call(asset) for asset in assets]))
 
     # Single attribute
     def create_attribute(self, attribute: Attribute) -> Attribute:
-        data = attribute.post()
-        resp = self.post(f"assets/types/{attribute.asset_type_id}/attributes", data=data)
-        return Attribute.from_api(resp)
+        return self.execute(self._create_attribute_call(attribute))
+
+    def _create_attribute_call(self, attribute: Attribute) -> ApiCall:
+        return ApiCall(
+            "POST",
+            f"assets/types/{attribute.asset_type_id}/attributes",
+            data=attribute.post(),
+            parser=Attribute.from_api,
+        )
 
     def get_attribute(self, attribute_id: str) -> Attribute:
         resp = self.get(f"assets/attributes/{attribute_id}")
         return Attribute.from_api(resp)
 
     def update_attribute(self, attribute: Attribute) -> None:
-        data = attribute.put()
-        self.put(f"assets/attributes/{attribute.id}", data=data)
+        self.execute(self._update_attribute_call(attribute))
+
+    def _update_attribute_call(self, attribute: Attribute) -> ApiCall:
+        return ApiCall("PUT", f"assets/attributes/{attribute.id}", data=attribute.put())
 
     def delete_attribute(self, attribute: Attribute) -> None:
-        self.delete(f"assets/attributes/{attribute.id}")
+        self.execute(self._delete_attribute_call(attribute))
+
+    def _delete_attribute_call(self, attribute: Attribute) -> ApiCall:
+        return ApiCall("DELETE", f"assets/attributes/{attribute.id}")
 
     # Batch attributes
     def create_attributes(self, attributes: List[Attribute]) -> List[Attribute]:
-        # TODO: batch create
-        return [self.create_attribute(attribute) for attribute in attributes]
+        return gather(self.map([self._create_attribute_call(a) for a in attributes]))
 
     def get_attributes(
         self, asset_type_id: str, page_options: Optional[PageOptions] = None
@@ -383,23 +418,22 @@ class AssetsService(ConfiguredApi):
         )
 
     def update_attributes(self, attributes: List[Attribute]) -> None:
-        # TODO: batch update
-        for attribute in attributes:
-            self.update_attribute(attribute)
+        gather(self.map([self._update_attribute_call(a) for a in attributes]))
 
     def delete_attributes(self, attributes: List[Attribute]) -> None:
-        # TODO: batch delete
-        for attribute in attributes:
-            self.delete_attribute(attribute)
+        gather(self.map([self._delete_attribute_call(a) for a in attributes]))
 
     # Single attribute value
     def create_attribute_value(self, attribute_value: AttributeValue) -> AttributeValue:
-        data = attribute_value.post()
-        resp = self.post(
-            (f"assets/{attribute_value.asset_id}/attributes" f"/{attribute_value.attribute_id}/values"),
-            data=data,
+        return self.execute(self._create_attribute_value_call(attribute_value))
+
+    def _create_attribute_value_call(self, attribute_value: AttributeValue) -> ApiCall:
+        return ApiCall(
+            "POST",
+            f"assets/{attribute_value.asset_id}/attributes/{attribute_value.attribute_id}/values",
+            data=attribute_value.post(),
+            parser=AttributeValue.from_api,
         )
-        return AttributeValue.from_api(resp)
 
     def get_attribute_value(self, attribute_value: AttributeValue) -> Optional[AttributeValue]:
         # HACK: work around since you cannot fetch a single attribute value
@@ -410,24 +444,28 @@ class AssetsService(ConfiguredApi):
         return None
 
     def update_attribute_value(self, attribute_value: AttributeValue) -> None:
-        data = attribute_value.put()
-        self.put(f"assets/attributes/values/{attribute_value.id}", data=data)
+        self.execute(self._update_attribute_value_call(attribute_value))
+
+    def _update_attribute_value_call(self, attribute_value: AttributeValue) -> ApiCall:
+        return ApiCall(
+            "PUT", f"assets/attributes/values/{attribute_value.id}", data=attribute_value.put()
+        )
 
     def delete_attribute_value(self, attribute_value: AttributeValue) -> None:
-        self.delete(f"assets/attributes/values/{attribute_value.id}")
+        self.execute(self._delete_attribute_value_call(attribute_value))
+
+    def _delete_attribute_value_call(self, attribute_value: AttributeValue) -> ApiCall:
+        return ApiCall("DELETE", f"assets/attributes/values/{attribute_value.id}")
 
     # Batch attribute values
     def create_attribute_values(self, attribute_values: List[AttributeValue]) -> List[AttributeValue]:
-        # TODO: batch create
-        return [self.create_attribute_value(attribute_value) for attribute_value in attribute_values]
+        return gather(self.map([self._create_attribute_value_call(v) for v in attribute_values]))
 
     def get_attribute_values(self, asset_id: str) -> List[AttributeValue]:
         return [AttributeValue.from_api(rec) for rec in self.get(f"assets/{asset_id}/attributes/values")]
 
     def update_attribute_values(self, attribute_values: List[AttributeValue]) -> None:
-        # TODO: batch update
-        for attribute_value in attribute_values:
-            self.update_attribute_value(attribute_value)
+        gather(self.map([self._update_attribute_value_call(v) for v in attribute_values]))
 
     def upsert_attribute_values(self, attribute_values: List[AttributeValue]) -> List[AttributeValue]:
         # Verify list is non-empty
@@ -450,31 +488,39 @@ class AssetsService(ConfiguredApi):
         ]
 
     def delete_attribute_values(self, attribute_values: List[AttributeValue]) -> None:
-        # TODO: batch delete
-        for attribute_value in attribute_values:
-            self.delete_attribute_value(attribute_value)
+        gather(self.map([self._delete_attribute_value_call(v) for v in attribute_values]))
 
     # Single metric
     def create_metric(self, metric: Metric) -> Metric:
-        data = metric.post()
-        resp = self.post(f"assets/types/{metric.asset_type_id}/metrics", data=data)
-        return Metric.from_api(resp)
+        return self.execute(self._create_metric_call(metric))
+
+    def _create_metric_call(self, metric: Metric) -> ApiCall:
+        return ApiCall(
+            "POST",
+            f"assets/types/{metric.asset_type_id}/metrics",
+            data=metric.post(),
+            parser=Metric.from_api,
+        )
 
     def get_metric(self, metric_id: str) -> Metric:
         resp = self.get(f"assets/metrics/{metric_id}")
         return Metric.from_api(resp)
 
     def update_metric(self, metric: Metric) -> None:
-        data = metric.put()
-        self.put(f"assets/metrics/{metric.id}", data=data)
+        self.execute(self._update_metric_call(metric))
+
+    def _update_metric_call(self, metric: Metric) -> ApiCall:
+        return ApiCall("PUT", f"assets/metrics/{metric.id}", data=metric.put())
 
     def delete_metric(self, metric: Metric) -> None:
-        self.delete(f"assets/metrics/{metric.id}")
+        self.execute(self._delete_metric_call(metric))
+
+    def _delete_metric_call(self, metric: Metric) -> ApiCall:
+        return ApiCall("DELETE", f"assets/metrics/{metric.id}")
 
     # Batch metrics
     def create_metrics(self, metrics: List[Metric]) -> List[Metric]:
-        # TODO: batch create
-        return [self.create_metric(metric_value) for metric_value in metrics]
+        return gather(self.map([self._create_metric_call(m) for m in metrics]))
 
     def get_metrics(
         self, asset_type_id: str, page_options: Optional[PageOptions] = None
@@ -487,23 +533,22 @@ class AssetsService(ConfiguredApi):
         )
 
     def update_metrics(self, metrics: List[Metric]) -> None:
-        # TODO: batch update
-        for metric in metrics:
-            self.update_metric(metric)
+        gather(self.map([self._update_metric_call(m) for m in metrics]))
 
     def delete_metrics(self, metrics: List[Metric]) -> None:
-        # TODO: batch delete
-        for metric in metrics:
-            self.delete_metric(metric)
+        gather(self.map([self._delete_metric_call(m) for m in metrics]))
 
     # Single metric value
     def create_metric_value(self, metric_value: MetricValue) -> MetricValue:
-        data = metric_value.post()
-        resp = self.post(
-            (f"assets/{metric_value.asset_id}/metrics" f"/{metric_value.asset_metric_id}/values"),
-            data=data,
+        return self.execute(self._create_metric_value_call(metric_value))
+
+    def _create_metric_value_call(self, metric_value: MetricValue) -> ApiCall:
+        return ApiCall(
+            "POST",
+            f"assets/{metric_value.asset_id}/metrics/{metric_value.asset_metric_id}/values",
+            data=metric_value.post(),
+            parser=MetricValue.from_api,
         )
-        return MetricValue.from_api(resp)
 
     def get_metric_value(self, metric_value: MetricValue) -> Optional[MetricValue]:
         # HACK: work around since you cannot fetch a single metric value
@@ -514,16 +559,20 @@ class AssetsService(ConfiguredApi):
         return None
 
     def update_metric_value(self, metric_value: MetricValue) -> None:
-        data = metric_value.put()
-        self.put(f"assets/metrics/values/{metric_value.id}", data=data)
+        self.execute(self._update_metric_value_call(metric_value))
+
+    def _update_metric_value_call(self, metric_value: MetricValue) -> ApiCall:
+        return ApiCall("PUT", f"assets/metrics/values/{metric_value.id}", data=metric_value.put())
 
     def delete_metric_value(self, metric_value: MetricValue) -> None:
-        self.delete(f"assets/metrics/values/{metric_value.id}")
+        self.execute(self._delete_metric_value_call(metric_value))
+
+    def _delete_metric_value_call(self, metric_value: MetricValue) -> ApiCall:
+        return ApiCall("DELETE", f"assets/metrics/values/{metric_value.id}")
 
     # Batch metric values
     def create_metric_values(self, metric_values: List[MetricValue]) -> List[MetricValue]:
-        # TODO: batch create
-        return [self.create_metric_value(metric_value) for metric_value in metric_values]
+        return gather(self.map([self._create_metric_value_call(v) for v in metric_values]))
 
     def get_metric_values(
         self,
@@ -547,11 +596,82 @@ class AssetsService(ConfiguredApi):
         )
 
     def update_metric_values(self, metric_values: List[MetricValue]) -> None:
-        # TODO: batch update
-        for metric_value in metric_values:
-            self.update_metric_value(metric_value)
+        gather(self.map([self._update_metric_value_call(v) for v in metric_values]))
 
     def delete_metric_values(self, metric_values: List[MetricValue]) -> None:
-        # TODO: batch delete
-        for metric_value in metric_values:
-            self.delete_metric_value(metric_value)
+        gather(self.map([self._delete_metric_value_call(v) for v in metric_values]))
+
+
+class AsyncAssetsService(AsyncConfiguredApi):
+    """Asyncio Assets API client, with awaitable variants of the `AssetsService` reads"""
+
+    _envs = AssetsService._envs
+
+    def __init__(
+        self, auth: Auth, organization_id: Optional[str] = None, env: str = "production", **kwargs
+    ) -> None:
+        super().__init__(env=env, auth=auth, **kwargs)
+        self.organization_id = organization_id
+
+    async def get_asset(self, asset_id: str) -> Asset:
+        resp = await self.get(f"assets/{asset_id}")
+        return Asset.from_api(resp)
+
+    def get_asset_types(
+        self, organization_id: Optional[str] = None, page_options: Optional[PageOptions] = None
+    ) -> AsyncPagedRecords[AssetType]:
+        url = f"organizations/{organization_id}/assets/types" if organization_id else "assets/types"
+        return AsyncPagedRecords(
+            api=self, url=url, options=page_options, record_parser=AssetType.from_api
+        )
+
+    def get_assets(
+        self, asset_type_id: Optional[str] = None, page_options: Optional[PageOptions] = None
+    ) -> AsyncPagedRecords[Asset]:
+        return AsyncPagedRecords(
+            api=self,
+            url="assets",
+            params={"asset_type_id": asset_type_id},
+            options=page_options,
+            record_parser=Asset.from_api,
+        )
+
+    def get_assets_for_organization(
+        self,
+        asset_type_id: Optional[str] = None,
+        attribute_id: Optional[str] = None,
+        attribute_value: Optional[str] = None,
+        organization_id: Optional[str] = None,
+        page_options: Optional[PageOptions] = None,
+    ) -> AsyncPagedRecords[Asset]:
+        organization_id = organization_id or self.organization_id
+        return AsyncPagedRecords(
+            api=self,
+            url=f"organizations/{organization_id}/assets",
+            params={
+                "asset_type_id": asset_type_id,
+                "asset_attribute_id": attribute_id,
+                "asset_attribute_value": attribute_value,
+            },
+            options=page_options,
+            record_parser=Asset.from_api,
+        )
+
+    async def get_attribute_values(self, asset_id: str) -> List[AttributeValue]:
+        resp = await self.get(f"assets/{asset_id}/attributes/values")
+        return [AttributeValue.from_api(rec) for rec in resp]
+
+    def get_metric_values(
+        self,
+        asset_id: str,
+        metric_id: Optional[str] = None,
+        page_options: Optional[PageOptions] = None,
+    ) -> AsyncPagedRecords[MetricValue]:
+        url = (
+            f"assets/{asset_id}/metrics/{metric_id}/values"
+            if metric_id
+            else f"assets/{asset_id}/metrics/values"
+        )
+        return AsyncPagedRecords(
+            api=self, url=url, options=page_options, record_parser=MetricValue.from_api
+        )
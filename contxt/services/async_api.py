@@ -0,0 +1,247 @@
+"""Asyncio counterparts to `contxt.services.api`.
+
+Requires the optional dependency `aiohttp` (`pip install aiohttp`).
+"""
+
+import asyncio
+import random
+from time import monotonic
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+from ..auth import Auth, TokenProvider
+from ..utils import make_logger
+from ..utils.json_codec import JsonCodec, default_codec
+from .api import ApiEnvironments, ApiRetry
+from .circuit_breaker import CircuitBreaker, CircuitBreakerRegistry
+from .instrumentation import LoggingListener, RequestEvent, RequestListener, endpoint_template
+
+if TYPE_CHECKING:
+    from aiohttp import ClientResponse, ClientSession
+
+logger = make_logger(__name__)
+
+
+def _import_aiohttp() -> Any:
+    try:
+        import aiohttp
+    except ImportError as e:  # pragma: no cover
+        raise ImportError("AsyncApi requires aiohttp, install it with `pip install aiohttp`") from e
+    return aiohttp
+
+
+def _clean_params(params: Optional[Dict]) -> Optional[Dict[str, str]]:
+    # NOTE: mimic requests, which drops None values and stringifies the rest
+    if params is None:
+        return None
+    return {k: str(v) for k, v in params.items() if v is not None}
+
+
+class AsyncApi:
+    """An asyncio API with url `base_url`, mirroring `Api`.
+
+    If `token_provider` is specified, all requests will be authenticated with
+    the access token it provides, which is fetched (or refreshed) off the event
+    loop, since token providers block. Pass the same `session` to several instances
+    to share one connection pool between them, otherwise a session is created
+    on first use (inside the running event loop). Requests are reported to
+    `listeners`, JSON bodies are encoded with `codec`, and failing hosts trip their
+    shared `circuit_breaker`, as by `Api`.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        token_provider: Optional[TokenProvider] = None,
+        retry: Optional[ApiRetry] = ApiRetry(),
+        session: Optional["ClientSession"] = None,
+        limit: int = 100,
+        listeners: Optional[List[RequestListener]] = None,
+        codec: Optional[JsonCodec] = None,
+        circuit_breaker: Union[bool, CircuitBreaker] = True,
+    ) -> None:
+        self.base_url = base_url if base_url.endswith("/") else f"{base_url}/"
+        self.token_provider = token_provider
+        self.retry = retry
+        self.limit = limit
+        self.headers = {"Cache-Control": "no-cache"}
+        self._session = session
+        self._owns_session = session is None
+        self._token_lock: Optional[asyncio.Lock] = None
+        self.listeners: List[RequestListener] = (
+            [LoggingListener(logger)] if listeners is None else list(listeners)
+        )
+        self.codec = codec or default_codec()
+        host = urlsplit(self.base_url).netloc
+        self.circuit_breaker = CircuitBreakerRegistry.resolve(host, circuit_breaker)
+
+    async def __aenter__(self) -> "AsyncApi":
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        await self.close()
+
+    @property
+    def session(self) -> "ClientSession":
+        if self._session is None or self._session.closed:
+            aiohttp = _import_aiohttp()
+            self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.limit))
+            self._owns_session = True
+        return self._session
+
+    async def close(self) -> None:
+        """Closes the session, if it was created by this instance"""
+        if self._owns_session and self._session is not None:
+            await self._session.close()
+        self._session = None
+
+    def _url(self, uri: str) -> str:
+        return f"{self.base_url}{uri}"
+
+    async def _headers(self) -> Dict[str, str]:
+        headers = dict(self.headers)
+        if self.token_provider:
+            headers["Authorization"] = f"Bearer {await self._access_token(self.token_provider)}"
+        return headers
+
+    async def _access_token(self, token_provider: TokenProvider) -> str:
+        # NOTE: getting the token may block on a request to refresh it, so get it on an
+        # executor, one request at a time (the lock is created inside the running loop)
+        if self._token_lock is None:
+            self._token_lock = asyncio.Lock()
+        async with self._token_lock:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, lambda: token_provider.access_token)
+
+    def _should_retry(
+        self, method: str, status: Optional[int], attempt: int, has_retry_after: bool = False
+    ) -> bool:
+        retry = self.retry
+        # NOTE: unlike urllib3, attempts are only bounded by `total` (no retries if unset)
+        if not retry or attempt >= (retry.total or 0):
+            return False
+        if status is not None:
+            return retry.is_retry(method.upper(), status, has_retry_after)
+        allowed = getattr(retry, "allowed_methods", None) or getattr(retry, "method_whitelist", None)
+        return not allowed or method.upper() in allowed
+
+    def _backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        retry = self.retry
+        if not retry:
+            return 0
+        if retry_after and retry.respect_retry_after_header:
+            try:
+                return float(retry_after)
+            except ValueError:
+                pass
+        backoff = retry.backoff_factor * (2 ** attempt)
+        return backoff * (1 + random.uniform(0, getattr(retry, "jitter", 0)))
+
+    async def _request(self, method: str, uri: str, **kwargs) -> Tuple["ClientResponse", Any]:
+        aiohttp = _import_aiohttp()
+        url = self._url(uri)
+        if "params" in kwargs:
+            kwargs["params"] = _clean_params(kwargs["params"])
+        headers = {**(await self._headers()), **kwargs.pop("headers", {})}
+        body = kwargs.pop("json", None)
+        if body is not None and not kwargs.get("data"):
+            kwargs["data"] = self.codec.dumps(body)
+            headers["Content-Type"] = "application/json"
+        attempt = 0
+        t0 = monotonic()
+        breaker = self.circuit_breaker
+        if breaker:
+            breaker.before_request()
+        try:
+            while True:
+                retry_after = None
+                try:
+                    async with self.session.request(method, url, headers=headers, **kwargs) as response:
+                        body = await response.read()
+                        retry_after = response.headers.get("Retry-After")
+                        if not self._should_retry(
+                            method, response.status, attempt, retry_after is not None
+                        ):
+                            break
+                        logger.debug("Retrying %s %s after status %s", method, url, response.status)
+                except aiohttp.ClientError as e:
+                    retryable = isinstance(e, aiohttp.ClientConnectionError)
+                    if not retryable or not self._should_retry(method, None, attempt):
+                        raise
+                    logger.debug("Retrying %s %s after connection error", method, url)
+                await asyncio.sleep(self._backoff(attempt, retry_after))
+                attempt += 1
+        except BaseException:
+            # NOTE: any error (including a timeout or cancellation) also ends a half-open trial
+            if breaker:
+                breaker.record_failure()
+            raise
+        if breaker:
+            breaker.record_status(response.status)
+        self._instrument(response, body, monotonic() - t0, attempt)
+        return response, body
+
+    def _instrument(self, response: "ClientResponse", body: bytes, elapsed: float, retries: int) -> None:
+        listeners = [listener for listener in self.listeners if listener.enabled()]
+        if not listeners:
+            return
+        url = str(response.url)
+        event = RequestEvent(
+            method=response.method,
+            endpoint=endpoint_template(url.replace(self.base_url, "")),
+            url=url,
+            status=response.status,
+            elapsed=elapsed,
+            request_bytes=int(response.request_info.headers.get("Content-Length", 0)),
+            response_bytes=len(body),
+            retries=retries,
+        )
+        for listener in listeners:
+            listener.on_request(event)
+
+    def _get_json(self, body: bytes) -> Any:
+        try:
+            return self.codec.loads(body)
+        except ValueError:
+            return {}
+
+    def _process_response(self, response: "ClientResponse", body: bytes) -> Any:
+        if response.status >= 400:
+            # Log the response's message, and raise
+            response_json = self._get_json(body)
+            message = response_json.get("message") if isinstance(response_json, dict) else None
+            msg = message or body.decode(errors="replace")
+            logger.debug(f"HTTP Error: {response.reason} - {msg}")
+            response.raise_for_status()
+        return self._get_json(body)
+
+    async def get(self, uri: str, params: Optional[Dict] = None, **kwargs) -> Any:
+        """Sends a GET request"""
+        return self._process_response(*await self._request("GET", uri, params=params, **kwargs))
+
+    async def post(
+        self, uri: str, data: Optional[Dict] = None, json: Optional[Dict] = None, **kwargs
+    ) -> Any:
+        """Sends a POST request"""
+        return self._process_response(*await self._request("POST", uri, data=data, json=json, **kwargs))
+
+    async def put(
+        self, uri: str, data: Optional[Dict] = None, json: Optional[Dict] = None, **kwargs
+    ) -> Any:
+        """Sends a PUT request"""
+        return self._process_response(*await self._request("PUT", uri, data=data, json=json, **kwargs))
+
+    async def delete(self, uri: str, **kwargs) -> Any:
+        """Sends a DELETE request"""
+        return self._process_response(*await self._request("DELETE", uri, **kwargs))
+
+
+class AsyncConfiguredApi(ApiEnvironments, AsyncApi):
+    """An `AsyncApi` configured for multiple environments, mirroring `ConfiguredApi`.
+
+    Overload this class to implement `_envs`.
+    """
+
+    def __init__(self, env: str, auth: Optional[Auth] = None, **kwargs) -> None:
+        base_url, token_provider = self._configure(env, auth)
+        super().__init__(base_url=base_url, token_provider=token_provider, **kwargs)
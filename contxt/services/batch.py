@@ -0,0 +1,158 @@
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from math import ceil
+from time import sleep
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Set, Tuple
+
+from requests import Request
+from requests.exceptions import HTTPError
+
+from ..models.iot import BatchRequest, BatchRequests, BatchResponses
+from ..utils import make_logger
+from ..utils.object_mapper import ObjectMapper
+from .api import IDEMPOTENT_METHODS, Api
+
+logger = make_logger(__name__)
+
+# Maximum number of requests the server accepts in one batch
+MAX_BATCH_REQUESTS = 200
+
+# Statuses of batched requests worth retrying
+RETRY_STATUS_CODES = frozenset((429, 500, 502, 503, 504))
+
+
+class BatchError(IOError):
+    """Raised when batched requests failed, with the failed `responses`"""
+
+    def __init__(self, msg: str, responses: BatchResponses) -> None:
+        super().__init__(msg)
+        self.responses = responses
+
+
+class Batcher:
+    """Sends many requests to `api` through its batch endpoint `uri`.
+
+    Requests are sent in chunks of up to `max_requests`, and each request that
+    fails with a transient status is retried, up to `max_attempts` times in all.
+    So is a chunk of idempotent requests whose batch request itself fails with a
+    transient status, after a backoff of `backoff_factor * 2 ** retry` seconds.
+    """
+
+    def __init__(
+        self,
+        api: Api,
+        uri: str = "batch",
+        max_requests: int = MAX_BATCH_REQUESTS,
+        max_attempts: int = 3,
+        backoff_factor: float = 0.1,
+    ) -> None:
+        self.api = api
+        self.uri = uri
+        self.max_requests = max_requests
+        self.max_attempts = max_attempts
+        self.backoff_factor = backoff_factor
+
+    def request(self, method: str, uri: str, params: Optional[Dict] = None, **kwargs) -> BatchRequest:
+        """Build a `BatchRequest` to `uri` (relative to `api`, unless absolute)"""
+        url = uri if "://" in uri else self.api._url(uri)
+        return BatchRequest.from_request(Request(method=method, url=url, params=params, **kwargs))
+
+    def _post(self, requests: BatchRequests) -> BatchResponses:
+        prepared_requests = {label: req.to_api() for label, req in requests.items()}
+        # NOTE: the api does not retry a failed POST, since it may have been acted on,
+        # but resending a batch of idempotent requests is safe
+        idempotent = all(req.method.upper() in IDEMPOTENT_METHODS for req in requests.values())
+        for retry in range(self.max_attempts):
+            try:
+                resp = self.api.post(self.uri, json=prepared_requests)
+                break
+            except HTTPError as e:
+                status = e.response.status_code if e.response is not None else None
+                if not idempotent or status not in RETRY_STATUS_CODES or retry + 1 >= self.max_attempts:
+                    raise
+                logger.warning(f"Retrying batch of {len(requests)} requests after status {status}")
+                sleep(self.backoff_factor * 2 ** retry)
+        return ObjectMapper.tree_to_object(resp, BatchResponses)
+
+    def _chunks(self, requests: BatchRequests) -> Iterator[BatchRequests]:
+        items = list(requests.items())
+        for i in range(0, len(items), self.max_requests):
+            yield dict(items[i : i + self.max_requests])
+
+    def send(self, requests: BatchRequests) -> BatchResponses:
+        """Send `requests`, and get their responses, including those that failed"""
+        responses: BatchResponses = {}
+        pending = dict(requests)
+        for attempt in range(1, self.max_attempts + 1):
+            retries: BatchRequests = {}
+            for chunk in self._chunks(pending):
+                logger.info(f"Making {len(chunk)} batched requests to {self.api.base_url}")
+                for label, resp in self._post(chunk).items():
+                    responses[label] = resp
+                    if resp.statusCode in RETRY_STATUS_CODES and attempt < self.max_attempts:
+                        retries[label] = chunk[label]
+            if not retries:
+                break
+            logger.warning(f"Retrying {len(retries)} failed batched requests (attempt {attempt})")
+            pending = retries
+        return responses
+
+    def get(self, uris: Dict[str, Tuple[str, Optional[Dict]]]) -> Dict[str, Any]:
+        """Get the bodies of GET requests to `uris`, as (uri, params) by label.
+        Raises `BatchError` if any request failed."""
+        responses = self.send(
+            {label: self.request("GET", uri, params) for label, (uri, params) in uris.items()}
+        )
+        return self.bodies(responses)
+
+    def pages(
+        self,
+        requests: BatchRequests,
+        parser: Callable[[str, Any], Tuple[Any, Optional[BatchRequest]]],
+        max_in_flight: int = 4,
+    ) -> Iterator[Tuple[str, Any, bool]]:
+        """Send `requests`, and the requests that follow them, with up to
+        `max_in_flight` batches in flight at once. The queued requests are split
+        evenly between the batches, so fewer than `max_requests` still go concurrently.
+
+        `parser` is called on a worker thread with the label and body of each
+        response, and returns its value and the next request for that label (or
+        `None`). Yields (label, value, done) as batches complete, where `done` is
+        whether it was the last response for the label. Raises `BatchError` if
+        any request failed.
+        """
+        queue: Deque[Tuple[str, BatchRequest]] = deque(requests.items())
+        in_flight: Set[Future] = set()
+
+        def run(chunk: BatchRequests) -> List[Tuple[str, Any, Optional[BatchRequest]]]:
+            bodies = self.bodies(self.send(chunk))
+            return [(label, *parser(label, body)) for label, body in bodies.items()]  # type: ignore
+
+        with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+            try:
+                while queue or in_flight:
+                    # Top up batches in flight, spreading the queued requests over them
+                    while queue and len(in_flight) < max_in_flight:
+                        slots = max_in_flight - len(in_flight)
+                        size = min(self.max_requests, ceil(len(queue) / slots))
+                        chunk = dict(queue.popleft() for _ in range(size))
+                        in_flight.add(executor.submit(run, chunk))
+
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        for label, value, next_request in future.result():
+                            if next_request is not None:
+                                queue.append((label, next_request))
+                            yield label, value, next_request is None
+            finally:
+                for future in in_flight:
+                    future.cancel()
+
+    @staticmethod
+    def bodies(responses: BatchResponses) -> Dict[str, Any]:
+        """Get the bodies of `responses`. Raises `BatchError` if any request failed."""
+        failed = {label: resp for label, resp in responses.items() if not resp.ok}
+        if failed:
+            statuses: List[int] = sorted({resp.statusCode for resp in failed.values()})
+            raise BatchError(f"{len(failed)} batched requests failed with {statuses}", failed)
+        return {label: resp.body for label, resp in responses.items()}
@@ -0,0 +1,166 @@
+import re
+import shelve
+from collections import OrderedDict
+from dataclasses import dataclass
+from fnmatch import fnmatch
+from os import PathLike
+from threading import RLock
+from time import time
+from typing import Any, Dict, Optional, Tuple, Union
+
+from ..utils import make_logger
+from .instrumentation import endpoint_template
+
+logger = make_logger(__name__)
+
+CacheKey = str
+
+
+@dataclass
+class CacheEntry:
+    value: Any
+    expires_at: float
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+    @property
+    def fresh(self) -> bool:
+        return time() < self.expires_at
+
+    def validators(self) -> Dict[str, str]:
+        """Get the headers to revalidate this entry"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """A cache of parsed GET responses, for `Api`.
+
+    Entries are keyed by url, params, and principal (i.e. who is authenticated), so
+    one cache may be shared by several `Api`s. They are held in an in-memory LRU of
+    up to `max_entries`, and optionally persisted to a shelf at `path`. An entry is
+    served without a request for the TTL of its endpoint, i.e. the first of `ttls`
+    whose pattern matches the endpoint template (such as `"feeds/{id}/fields"`), or
+    else `ttl` seconds. Once stale, it is revalidated with `If-None-Match` or
+    `If-Modified-Since`, if the server provided an `ETag` or `Last-Modified`.
+
+    Cached values are shared between callers, so they must not be mutated.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: float = 60,
+        ttls: Optional[Dict[str, float]] = None,
+        path: Optional[Union[str, PathLike]] = None,
+    ) -> None:
+        assert max_entries > 0, f"max_entries must be a positive integer, not {max_entries}"
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.ttls = ttls or {}
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[CacheKey, CacheEntry]" = OrderedDict()
+        self._shelf: "Optional[shelve.Shelf[CacheEntry]]" = shelve.open(str(path)) if path else None
+        self._lock = RLock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def key(url: str, params: Optional[Dict] = None, principal: Optional[Any] = None) -> CacheKey:
+        query = "&".join(f"{k}={v}" for k, v in sorted((params or {}).items()) if v is not None)
+        key = f"{url}?{query}" if query else url
+        return key if principal is None else f"{key}#{principal}"
+
+    def ttl_for(self, uri: str) -> float:
+        endpoint = endpoint_template(uri)
+        for pattern, ttl in self.ttls.items():
+            if fnmatch(endpoint, pattern):
+                return ttl
+        return self.ttl
+
+    def get(self, key: CacheKey) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None and self._shelf is not None:
+                entry = self._shelf.get(key)
+                if entry is not None:
+                    self._store(key, entry)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            if entry.fresh:
+                self.hits += 1
+            return entry
+
+    def set(
+        self,
+        key: CacheKey,
+        value: Any,
+        ttl: Optional[float] = None,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> None:
+        """Cache `value` for `ttl` seconds (by default, `self.ttl`)"""
+        ttl = self.ttl if ttl is None else ttl
+        if ttl <= 0 and not (etag or last_modified):
+            return
+        entry = CacheEntry(value, expires_at=time() + ttl, etag=etag, last_modified=last_modified)
+        with self._lock:
+            self._store(key, entry)
+            if self._shelf is not None:
+                self._shelf[key] = entry
+
+    def refresh(self, key: CacheKey, entry: CacheEntry, ttl: Optional[float] = None) -> None:
+        """Extend the lifetime of `entry`, after it was revalidated"""
+        entry.expires_at = time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            if self._shelf is not None:
+                self._shelf[key] = entry
+
+    def invalidate(self, url: str) -> None:
+        """Drop entries (of any principal) for resource `url`, its sub-resources, and the
+        collections containing it"""
+        path = _segments(url)
+        with self._lock:
+            keys = list(self._entries.keys()) + (list(self._shelf.keys()) if self._shelf else [])
+            for key in set(keys):
+                cached = _segments(key)
+                n = min(len(path), len(cached))
+                if cached[:n] == path[:n]:
+                    self._entries.pop(key, None)
+                    if self._shelf is not None:
+                        self._shelf.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            if self._shelf is not None:
+                self._shelf.clear()
+
+    def close(self) -> None:
+        if self._shelf is not None:
+            self._shelf.close()
+            self._shelf = None
+
+    def info(self) -> Tuple[int, int, int]:
+        """Get the number of hits, misses, and entries"""
+        return self.hits, self.misses, len(self._entries)
+
+    def _store(self, key: CacheKey, entry: CacheEntry) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+def _segments(key: str) -> Tuple[str, ...]:
+    url = re.split(r"[?#]", key, 1)[0]
+    return tuple(s for s in url.split("/") if s)
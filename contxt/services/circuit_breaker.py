@@ -0,0 +1,109 @@
+from threading import Lock
+from time import monotonic
+from typing import Dict, Optional, Tuple, Union
+
+from requests.exceptions import ConnectionError
+
+from ..utils import make_logger
+
+logger = make_logger(__name__)
+
+
+class CircuitOpenError(ConnectionError):
+    """Raised instead of sending a request to a host whose circuit is open"""
+
+
+class CircuitBreaker:
+    """Fails fast on requests to a host that keeps failing.
+
+    After `failure_threshold` consecutive failures (connection errors, 429, or 5xx
+    responses, after retries) the circuit opens, and requests raise
+    `CircuitOpenError` without being sent. After `reset_timeout` seconds, a single
+    trial request is let through: success closes the circuit, failure reopens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, host: str, failure_threshold: int = 5, reset_timeout: float = 30) -> None:
+        self.host = host
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if monotonic() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def before_request(self) -> None:
+        """Raises `CircuitOpenError` if a request to the host should not be sent"""
+        with self._lock:
+            state = self.state
+            if state == self.CLOSED:
+                return
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+        raise CircuitOpenError(f"Circuit for {self.host} is open after {self.failures} failures")
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.opened_at is not None:
+                logger.info(f"Closing circuit for {self.host}")
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    logger.warning(f"Opening circuit for {self.host} after {self.failures} failures")
+                self.opened_at = monotonic()
+
+    def record_status(self, status: int) -> None:
+        if status == 429 or status >= 500:
+            self.record_failure()
+        else:
+            self.record_success()
+
+
+class CircuitBreakerRegistry:
+    """Process-wide registry of `CircuitBreaker`s, one per host and settings"""
+
+    _breakers: Dict[Tuple[str, int, float], CircuitBreaker] = {}
+    _lock = Lock()
+
+    @classmethod
+    def get(cls, host: str, failure_threshold: int = 5, reset_timeout: float = 30) -> CircuitBreaker:
+        """Get the circuit breaker for `host` with these settings, creating it if needed"""
+        key = (host, failure_threshold, reset_timeout)
+        with cls._lock:
+            if key not in cls._breakers:
+                cls._breakers[key] = CircuitBreaker(host, failure_threshold, reset_timeout)
+            return cls._breakers[key]
+
+    @classmethod
+    def resolve(
+        cls, host: str, circuit_breaker: Union[bool, CircuitBreaker]
+    ) -> Optional[CircuitBreaker]:
+        """Get the circuit breaker for an api of `host`: `circuit_breaker` itself, if an
+        instance, else the shared one with the default settings (or none, if `False`)"""
+        if isinstance(circuit_breaker, CircuitBreaker):
+            return circuit_breaker
+        return cls.get(host) if circuit_breaker else None
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._breakers.clear()
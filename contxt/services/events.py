@@ -1,8 +1,8 @@
-from typing import Iterable, List, Optional
+from typing import Dict, Iterable, List, Optional
 
 from ..auth import Auth
 from ..models.events import Event, EventDefinition, EventType, TriggeredEvent
-from .api import ApiEnvironment, ConfiguredApi
+from .api import ApiCall, ApiEnvironment, ConfiguredApi, gather
 from .pagination import PagedRecords, PageOptions
 
 
@@ -26,12 +26,17 @@ class EventsService(ConfiguredApi):
         super().__init__(env=env, auth=auth, **kwargs)
 
     def set_human_readable_parameters(self, event_definition: EventDefinition) -> None:
+        # Fetch all chained events at once
+        event_ids = {
+            d.get("event_id") for k, v in event_definition.parameters.items() if k == "$chain" for d in v
+        }
+        events = self.get_events(list(event_ids))
         statement = ""
         for k, v in event_definition.parameters.items():
             if k == "$chain":
                 for d1, d2 in zip(v[:-1], v[1:]):
-                    event1 = self.get_event(d1.get("event_id"))
-                    event2 = self.get_event(d2.get("event_id"))
+                    event1 = events[d1.get("event_id")]
+                    event2 = events[d2.get("event_id")]
                     mins = d1.get("overlap_variance") / 60
                     statement += f"Event {event1.name} overlaps with {event2.name} within {mins} min "
         event_definition.human_readable_parameters = statement
@@ -49,6 +54,12 @@ class EventsService(ConfiguredApi):
         resp = self.get(f"events/{event_id}")
         return Event.from_api(resp)
 
+    def get_events(self, event_ids: List[str]) -> Dict[str, Event]:
+        """Get events with ids `event_ids`, fetched concurrently. Raises `ApiResultsError`
+        if any failed."""
+        calls = [ApiCall("GET", f"events/{id}", parser=Event.from_api) for id in event_ids]
+        return dict(zip(event_ids, gather(self.map(calls))))
+
     def create_event(self, event: Event) -> Event:
         resp = self.post("events", data=event.post())
         return Event.from_api(resp)
@@ -0,0 +1,75 @@
+import re
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from logging import DEBUG, Logger
+from typing import Optional
+
+from ..utils import make_logger
+
+logger = make_logger(__name__)
+
+# Path segments that identify a resource, rather than name an endpoint
+_ID_SEGMENT = re.compile(
+    r"^(\d+|[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12})$"
+)
+
+
+def endpoint_template(uri: str) -> str:
+    """Get the endpoint of `uri`, without its query and with ids replaced by `{id}`,
+    i.e. `feeds/42/fields?limit=10` becomes `feeds/{id}/fields`"""
+    path = uri.split("?", 1)[0]
+    return "/".join("{id}" if _ID_SEGMENT.match(s) else s for s in path.split("/"))
+
+
+@dataclass
+class RequestEvent:
+    """A completed request. `elapsed` is in seconds, and `response_bytes` is
+    `None` if the response is streamed without a known length."""
+
+    method: str
+    endpoint: str
+    url: str
+    status: Optional[int]
+    elapsed: float
+    request_bytes: int
+    response_bytes: Optional[int]
+    retries: int
+
+
+class RequestListener(ABC):
+    """An abstract base class to receive a `RequestEvent` for every request an
+    `Api` sends. Events are only built while at least one listener is `enabled`.
+
+    Overload this class to implement `on_request()`.
+    """
+
+    def enabled(self) -> bool:
+        return True
+
+    @abstractmethod
+    def on_request(self, event: RequestEvent) -> None:
+        """Handles event `event`"""
+
+
+class LoggingListener(RequestListener):
+    """Logs each request to `logger` at level `level`"""
+
+    def __init__(self, logger: Logger = logger, level: int = DEBUG) -> None:
+        self.logger = logger
+        self.level = level
+
+    def enabled(self) -> bool:
+        return self.logger.isEnabledFor(self.level)
+
+    def on_request(self, event: RequestEvent) -> None:
+        self.logger.log(
+            self.level,
+            "Called %s %s: %s in %.3f s (sent %s B, received %s B, %s retries)",
+            event.method,
+            event.url,
+            event.status,
+            event.elapsed,
+            event.request_bytes,
+            event.response_bytes,
+            event.retries,
+        )
@@ -1,27 +1,36 @@
+import asyncio
 from collections import defaultdict
 from copy import deepcopy
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, Iterable, List, Optional, Tuple
-
-from requests import Request
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
 from ..auth import Auth
-from ..models import Parsers
 from ..models.iot import (
     BatchRequest,
     BatchRequests,
-    BatchResponses,
     Feed,
     Field,
     FieldGrouping,
     FieldTimeSeries,
     UnprovisionedField,
     Window,
+    parse_time_series,
 )
 from ..utils import is_datetime_aware, make_logger
-from ..utils.object_mapper import ObjectMapper
 from .api import ApiEnvironment, ConfiguredApi
-from .pagination import DataPoint, PagedRecords, PagedTimeSeries, PageOptions
+from .async_api import AsyncConfiguredApi
+from .batch import Batcher
+from .pagination import (
+    AdaptivePageSize,
+    AsyncPagedRecords,
+    AsyncPagedTimeSeries,
+    DataPoint,
+    PagedRecords,
+    PagedTimeSeries,
+    PageOptions,
+    ShardedTimeSeries,
+)
+from .series_cache import TimeSeriesCache
 
 logger = make_logger(__name__)
 
@@ -48,8 +57,16 @@ class IotService(ConfiguredApi):
         ),
     )
 
-    def __init__(self, auth: Auth, env: str = "production", **kwargs) -> None:
+    def __init__(
+        self,
+        auth: Auth,
+        env: str = "production",
+        series_cache: Optional[TimeSeriesCache] = None,
+        **kwargs,
+    ) -> None:
         super().__init__(env=env, auth=auth, **kwargs)
+        self.batcher = Batcher(self)
+        self.series_cache = series_cache
 
     def provision_field_for_feed(self, feed_id: int, field: Field) -> Field:
         resp = self.post(f"feeds/{feed_id}/fields", data=field.post())
@@ -147,23 +164,100 @@ class IotService(ConfiguredApi):
         window: Window = Window.RAW,
         end_time: Optional[datetime] = None,
         per_page: int = 1000,
+        stream: bool = False,
+        read_ahead: int = 0,
+        adaptive: Optional[AdaptivePageSize] = None,
+        typed: bool = False,
+        shards: int = 0,
     ) -> Iterable[DataPoint]:
-        """Get time series data for field `field`"""
+        """Get time series data for field `field`. With `stream`, points are decoded
+        one at a time while iterating, instead of a page at a time. With `read_ahead`,
+        up to that many next pages are fetched in the background while iterating.
+        With `adaptive`, the page size is adapted to the observed latency. With
+        `typed`, values are parsed as the field's value type, instead of inferred.
+
+        With `shards`, the time range is instead split into sub-ranges, which are
+        fetched by up to that many workers at once (see `ShardedTimeSeries`).
+
+        With a `series_cache`, a time range from `start_time` through `end_time` is
+        instead served from the cache, after fetching (as above) any gaps in it."""
         # Manually validate the window choice, since our API does not return a
         # helpful error message
         assert isinstance(window, Window), "window must be of type Window"
         assert (start_time is None) == (
             end_time is None
         ), "Either both start and end time should be provided, or both should be missing"
+        if self.series_cache is not None and start_time and end_time:
+            cache, key = self.series_cache, self.series_cache.key(field, window, typed)
+            # NOTE: the api's end time is inclusive, while the cache's ranges are half-open
+            start, end = int(start_time.timestamp()), int(end_time.timestamp()) + 1
+            for gap_start, gap_end in cache.gaps(key, start, end):
+                series = self._time_series_for_field(
+                    field,
+                    datetime.fromtimestamp(gap_start, tz=timezone.utc),
+                    window,
+                    datetime.fromtimestamp(gap_end - 1, tz=timezone.utc),
+                    per_page=per_page,
+                    stream=stream,
+                    read_ahead=read_ahead,
+                    adaptive=adaptive,
+                    typed=typed,
+                    shards=shards,
+                )
+                cache.put(key, gap_start, gap_end, series)
+            return cache.get(key, start, end)
+        return self._time_series_for_field(
+            field,
+            start_time,
+            window,
+            end_time,
+            per_page=per_page,
+            stream=stream,
+            read_ahead=read_ahead,
+            adaptive=adaptive,
+            typed=typed,
+            shards=shards,
+        )
+
+    def _time_series_for_field(
+        self,
+        field: Field,
+        start_time: Optional[datetime],
+        window: Window,
+        end_time: Optional[datetime],
+        per_page: int,
+        stream: bool = False,
+        read_ahead: int = 0,
+        adaptive: Optional[AdaptivePageSize] = None,
+        typed: bool = False,
+        shards: int = 0,
+    ) -> Iterable[DataPoint]:
+        url = f"outputs/{field.output_id}/fields/{field.field_human_name}/data"
+        if shards:
+            assert start_time and end_time, "Sharding requires both start and end time"
+            return ShardedTimeSeries(
+                api=self,
+                url=url,
+                start_time=start_time,
+                end_time=end_time,
+                params={"window": window.value},
+                per_page=per_page,
+                max_workers=shards,
+                value_type=field.value_type if typed else None,
+            )
         return PagedTimeSeries(
             api=self,
-            url=f"outputs/{field.output_id}/fields/{field.field_human_name}/data",
+            url=url,
             params={
                 "timeStart": int(start_time.timestamp()) if start_time else None,
                 "timeEnd": int(end_time.timestamp()) if end_time else None,
                 "window": window.value,
             },
             per_page=per_page,
+            stream=stream,
+            read_ahead=read_ahead,
+            adaptive=adaptive,
+            value_type=field.value_type if typed else None,
         )
 
     def get_time_series_for_fields(
@@ -172,69 +266,121 @@ class IotService(ConfiguredApi):
         start_time: datetime = None,
         window: Window = Window.RAW,
         end_time: Optional[datetime] = None,
+        per_page: int = 5000,
+        typed: bool = False,
+        max_in_flight: int = 4,
     ) -> List[FieldTimeSeries]:
-        """Get complete (non-paginated) time series data for each field in `fields`"""
+        """Get complete (non-paginated) time series data for each field in `fields`,
+        fetched in batches of pages of up to `per_page` points. With `typed`, values
+        are parsed as each field's value type, instead of inferred.
+
+        Raises `BatchError` if any request still fails after the batcher's retries
+        (see `iter_time_series_for_fields`), without the fields already fetched."""
+        return list(
+            self.iter_time_series_for_fields(
+                fields,
+                start_time=start_time,
+                window=window,
+                end_time=end_time,
+                per_page=per_page,
+                typed=typed,
+                max_in_flight=max_in_flight,
+            )
+        )
+
+    def iter_time_series_for_fields(
+        self,
+        fields: List[Field],
+        start_time: datetime = None,
+        window: Window = Window.RAW,
+        end_time: Optional[datetime] = None,
+        per_page: int = 5000,
+        typed: bool = False,
+        max_in_flight: int = 4,
+    ) -> Iterator[FieldTimeSeries]:
+        """Get complete time series data for each field in `fields`, yielded as
+        each field completes. Pages are fetched with up to `max_in_flight` batch
+        requests at once, and parsed on the workers sending them.
+
+        A page request that fails with a transient status is retried, up to the
+        batcher's `max_attempts` in all, after which `BatchError` is raised and no
+        more fields are yielded. (Before, retries went on for as long as any request
+        in the batch succeeded.) Fields already yielded are complete.
+
+        With a `series_cache`, fields are served from the cache as in
+        `get_time_series_for_field`, and only the gaps in it are fetched."""
         assert (start_time is None) == (
             end_time is None
         ), "Either both start and end time should be provided, or both should be missing"
-        # Build requests queue
-        params = {
-            "timeStart": int(start_time.timestamp()) if start_time else None,
-            "timeEnd": int(end_time.timestamp()) if end_time else None,
-            "window": window.value,
-            "limit": 5000,
-        }
-        queue: List[Tuple[str, BatchRequest]] = [
-            (
-                f.field_human_name,  # type: ignore
-                BatchRequest.from_request(
-                    Request(
-                        method="GET",
-                        url=self._url(f"outputs/{f.output_id}/fields/{f.field_human_name}/data"),
-                        params=params,
+        start = int(start_time.timestamp()) if start_time else None
+        end = int(end_time.timestamp()) if end_time else None
+        # The cache, with the (half-open) range it serves, if any
+        cached = (
+            (self.series_cache, start, end + 1)
+            if self.series_cache is not None and start is not None and end is not None
+            else None
+        )
+
+        # Request the first page of each range of each field, and then any next pages
+        requests: BatchRequests = {}
+        ranges: Dict[str, Tuple[Field, Optional[int], Optional[int]]] = {}
+        remaining: Dict[str, int] = {}
+        for f in fields:
+            name = str(f.field_human_name)
+            gaps: Sequence[Tuple[Optional[int], Optional[int]]] = [(start, end)]
+            if cached is not None:
+                cache, cache_start, cache_end = cached
+                key = cache.key(f, window, typed)
+                # NOTE: the cache's gaps are half-open, while the api's end time is inclusive
+                gaps = [(lo, hi - 1) for lo, hi in cache.gaps(key, cache_start, cache_end)]
+                if not gaps:
+                    yield FieldTimeSeries(
+                        field=f, time_series=dict(cache.get(key, cache_start, cache_end))
                     )
-                ),
-            )
-            for f in fields
-        ]
+                    continue
+            remaining[name] = len(gaps)
+            for gap_start, gap_end in gaps:
+                label = f"{name}@{gap_start}" if cached else name
+                ranges[label] = (f, gap_start, gap_end)
+                requests[label] = self.batcher.request(
+                    "GET",
+                    f"outputs/{f.output_id}/fields/{name}/data",
+                    {
+                        "timeStart": gap_start,
+                        "timeEnd": gap_end,
+                        "window": window.value,
+                        "limit": per_page,
+                    },
+                )
 
-        # Make all requests in queue
-        MAX_BATCH_REQUESTS = 200
-        records: Dict[str, Dict[datetime, str]] = defaultdict(dict)
-        while queue:
-            # Make next batch of requests
-            requests = dict(queue[:MAX_BATCH_REQUESTS])
-            del queue[:MAX_BATCH_REQUESTS]
-            logger.info(f"Making {len(requests)} batched requests to IOT API")
-            responses = self._batch_request(requests)
-            any_success = False
-
-            # Process responses
-            for name, resp in responses.items():
-                if resp.ok:
-                    any_success = True
-                    series = {
-                        Parsers.datetime(r["event_time"]): Parsers.unknown(r["value"])
-                        for r in resp.body["records"]
-                    }
-                    records[name].update(series)
-                    # Add request for next page
-                    next_page_url = resp.body["meta"]["next_page_url"]
-                    if next_page_url:
-                        queue.append((name, BatchRequest(method="GET", uri=next_page_url)))
-                else:
-                    # Retry request
-                    logger.warning(f"Got bad response from IOT API ({resp.body}). Retrying...")
-                    queue.append((name, requests[name]))
-
-            if not any_success:
-                raise IOError(f"All {len(requests)} batched requests to IOT API failed")
-
-        fields_by_name = {f.field_human_name: f for f in fields}
-        return [
-            FieldTimeSeries(field=fields_by_name[name], time_series=series)
-            for name, series in records.items()
-        ]
+        def parse(label: str, body: Dict) -> Tuple[List[DataPoint], Optional[BatchRequest]]:
+            value_type = ranges[label][0].value_type if typed else None
+            next_page_url = body["meta"]["next_page_url"]
+            next_request = BatchRequest(method="GET", uri=next_page_url) if next_page_url else None
+            return parse_time_series(body["records"], value_type), next_request
+
+        records: Dict[str, Dict[datetime, Any]] = defaultdict(dict)
+        for label, points, done in self.batcher.pages(requests, parse, max_in_flight):
+            field, gap_start, gap_end = ranges[label]
+            name = str(field.field_human_name)
+            if cached is None:
+                records[name].update(points)
+            else:
+                records[label].update(points)
+                if done:
+                    cache, cache_start, cache_end = cached
+                    # Cached ranges are only requested within the (bounded) range served
+                    assert gap_start is not None and gap_end is not None
+                    key = cache.key(field, window, typed)
+                    cache.put(key, gap_start, gap_end + 1, records.pop(label).items())
+            if done:
+                remaining[name] -= 1
+                if remaining[name] == 0:
+                    if cached is not None:
+                        cache, cache_start, cache_end = cached
+                        key = cache.key(field, window, typed)
+                        records[name] = dict(cache.get(key, cache_start, cache_end))
+                    yield FieldTimeSeries(field=field, time_series=records.pop(name))
 
     def get_time_series_for_field_grouping(
         self, grouping_id: str, **kwargs
@@ -273,10 +419,136 @@ class IotService(ConfiguredApi):
             record_parser=FieldGrouping.from_api,
         )
 
-    def _batch_request(self, requests: BatchRequests) -> BatchResponses:
-        prepared_requests = {label: req.to_api() for label, req in requests.items()}
-        resp = self.post("batch", json=prepared_requests)
-        return ObjectMapper.tree_to_object(resp, BatchResponses)
+    def get_feeds_with_ids(self, ids: Iterable[int]) -> Dict[int, Feed]:
+        """Get feeds with ids `ids`, in batched requests"""
+        ids = list(ids)
+        bodies = self.batcher.get({str(id): (f"feeds/{id}", None) for id in ids})
+        return {id: Feed.from_api(bodies[str(id)]) for id in ids}
+
+    def get_field_groupings_with_ids(self, ids: Iterable[str]) -> Dict[str, FieldGrouping]:
+        """Get field groupings with ids `ids`, in batched requests"""
+        ids = list(ids)
+        bodies = self.batcher.get({str(id): (f"groupings/{id}", None) for id in ids})
+        return {id: FieldGrouping.from_api(bodies[str(id)]) for id in ids}
+
+    def get_fields_for_feeds(
+        self, feed_ids: Iterable[int], per_page: int = 1000
+    ) -> Dict[int, List[Field]]:
+        """Get all fields for each feed with id in `feed_ids`, in batched requests"""
+        fields: Dict[int, List[Field]] = {id: [] for id in feed_ids}
+        offsets = {id: 0 for id in fields}
+        while offsets:
+            bodies = self.batcher.get(
+                {
+                    str(id): (f"feeds/{id}/fields", {"offset": offset, "limit": per_page})
+                    for id, offset in offsets.items()
+                }
+            )
+            for id in list(offsets):
+                body = bodies[str(id)]
+                fields[id].extend(Field.from_api(rec) for rec in body["records"])
+                offsets[id] += len(body["records"])
+                if not body["records"] or offsets[id] >= body["_metadata"]["totalRecords"]:
+                    del offsets[id]
+        return fields
+
+
+class AsyncIotService(AsyncConfiguredApi):
+    """Asyncio IOT API client, with awaitable variants of the `IotService` reads"""
+
+    _envs = IotService._envs
+
+    def __init__(self, auth: Auth, env: str = "production", **kwargs) -> None:
+        super().__init__(env=env, auth=auth, **kwargs)
+
+    async def get_feed_with_id(self, id: int) -> Feed:
+        """Get feed with id `id`"""
+        return Feed.from_api(await self.get(f"feeds/{id}"))
+
+    def get_feeds(
+        self,
+        facility_id: Optional[int] = None,
+        key: Optional[str] = None,
+        page_options: Optional[PageOptions] = None,
+    ) -> AsyncPagedRecords[Feed]:
+        """Get feeds with facility id `facility_id` and/or key `key`"""
+        return AsyncPagedRecords(
+            api=self,
+            url="feeds",
+            params={"facility_id": facility_id, "key": key},
+            options=page_options,
+            record_parser=Feed.from_api,
+        )
+
+    def get_fields_for_feed(
+        self, feed_id: int, page_options: Optional[PageOptions] = None
+    ) -> AsyncPagedRecords[Field]:
+        """Get fields for feed with id `feed_id`"""
+        return AsyncPagedRecords(
+            api=self, url=f"feeds/{feed_id}/fields", options=page_options, record_parser=Field.from_api
+        )
+
+    async def get_field_grouping(self, id: str) -> FieldGrouping:
+        """Get field grouping with id `id`"""
+        return FieldGrouping.from_api(await self.get(f"groupings/{id}"))
+
+    def get_time_series_for_field(
+        self,
+        field: Field,
+        start_time: datetime = None,
+        window: Window = Window.RAW,
+        end_time: Optional[datetime] = None,
+        per_page: int = 1000,
+        read_ahead: int = 0,
+        typed: bool = False,
+    ) -> AsyncPagedTimeSeries:
+        """Get time series data for field `field`, with values parsed as the field's
+        value type if `typed`"""
+        assert isinstance(window, Window), "window must be of type Window"
+        assert (start_time is None) == (
+            end_time is None
+        ), "Either both start and end time should be provided, or both should be missing"
+        return AsyncPagedTimeSeries(
+            api=self,
+            url=f"outputs/{field.output_id}/fields/{field.field_human_name}/data",
+            params={
+                "timeStart": int(start_time.timestamp()) if start_time else None,
+                "timeEnd": int(end_time.timestamp()) if end_time else None,
+                "window": window.value,
+            },
+            per_page=per_page,
+            read_ahead=read_ahead,
+            value_type=field.value_type if typed else None,
+        )
+
+    async def get_time_series_for_fields(
+        self,
+        fields: List[Field],
+        start_time: datetime = None,
+        window: Window = Window.RAW,
+        end_time: Optional[datetime] = None,
+        per_page: int = 5000,
+        concurrency: int = 50,
+        typed: bool = False,
+    ) -> List[FieldTimeSeries]:
+        """Get complete (non-paginated) time series data for each field in `fields`,
+        with up to `concurrency` fields fetched at once, and values parsed as each
+        field's value type if `typed`"""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def fetch(field: Field) -> FieldTimeSeries:
+            async with semaphore:
+                series = self.get_time_series_for_field(
+                    field,
+                    start_time=start_time,
+                    window=window,
+                    end_time=end_time,
+                    per_page=per_page,
+                    typed=typed,
+                )
+                return FieldTimeSeries(field=field, time_series={t: v async for t, v in series})
+
+        return list(await asyncio.gather(*[fetch(f) for f in fields]))
 
 
 def format_time_series(feed_key: str, time_series: Dict[str, Dict[datetime, float]]) -> Dict:
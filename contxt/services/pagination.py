@@ -1,25 +1,105 @@
-from dataclasses import dataclass
+import asyncio
+import gzip
+import json
+import os
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict, dataclass
 from datetime import datetime
+from functools import partial
 from math import ceil
-from typing import Any, Callable, Dict, Generic, Iterator, List, Optional, Tuple, TypeVar, Union
+from os import PathLike
+from queue import Full, Queue
+from threading import Event, Lock, Thread
+from time import monotonic
+from typing import (
+    Any,
+    AsyncIterator,
+    BinaryIO,
+    Callable,
+    Deque,
+    Dict,
+    Generic,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+)
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
 from ..models import Parsers
+from ..models.iot import FieldValueType, parse_time_series, value_parser
+from ..utils import make_logger
 from ..utils.object_mapper import ObjectMapper
-from .api import Api
+from .api import Api, ApiCall
+from .async_api import AsyncApi
+
+logger = make_logger(__name__)
 
 T = TypeVar("T")
 Record = Dict[str, Any]
 DataPoint = Tuple[datetime, Any]
 
 
+@dataclass
+class AdaptivePageSize:
+    """Grows or shrinks the page size between `min_per_page` and `max_per_page`, so
+    that each page takes about `target_seconds` and has at most `max_bytes` (if set)"""
+
+    min_per_page: int = 100
+    max_per_page: int = 10000
+    target_seconds: float = 1.0
+    max_bytes: Optional[int] = None
+
+    def __post_init__(self) -> None:
+        assert (
+            0 < self.min_per_page <= self.max_per_page
+        ), "Page size bounds must be positive and ordered"
+
+    def next_size(self, size: int, elapsed: float, nbytes: Optional[int] = None) -> int:
+        """Get the size of the next page, after a page of `size` took `elapsed` seconds"""
+        scale = self.target_seconds / max(elapsed, 1e-3)
+        if self.max_bytes and nbytes:
+            scale = min(scale, self.max_bytes / nbytes)
+        # NOTE: grow gradually, so a slow page does not time out
+        scale = min(scale, 2.0)
+        return max(self.min_per_page, min(self.max_per_page, int(size * scale)))
+
+
 @dataclass
 class PageOptions:
     per_page: int = 1000
     order_by: Optional[str] = None  # NOTE: ideally this should be an enum, if possible
     reverse_order: Optional[bool] = None
+    # Decode records one at a time while iterating, rather than a page at a time
+    stream: bool = False
+    # Fetch up to this many pages concurrently while iterating (holding at most
+    # twice as many in memory), once the total is known from the first page
+    prefetch: int = 0
+    # Keep the most recently used pages, up to this many pages and/or (encoded) bytes
+    cache_pages: Optional[int] = None
+    cache_bytes: Optional[int] = None
+    # Adapt the page size while iterating (without `stream` or `prefetch`), starting at `per_page`
+    adaptive: Optional[AdaptivePageSize] = None
+    # Page by the last key of `order_by` seen (passed as `keyset_param`) rather than by
+    # offset, for endpoints that support it. Only sequential iteration is supported.
+    keyset: bool = False
+    keyset_param: str = "after"
+    # Skip records with an already iterated value of this key, i.e. "id"
+    dedupe_key: Optional[str] = None
 
     def __post_init__(self) -> None:
         assert self.per_page > 0, f"per_page must be a positive integer, not {self.per_page}"
+        assert self.prefetch >= 0, f"prefetch must be a non-negative integer, not {self.prefetch}"
+        assert not self.keyset or self.order_by, "keyset pagination requires order_by"
+        if isinstance(self.adaptive, dict):
+            # i.e. from a cursor
+            self.adaptive = AdaptivePageSize(**self.adaptive)
 
     def to_api(self, index: int) -> Dict:
         return {
@@ -36,22 +116,120 @@ class PageMetadata:
     offset: int = 0
 
 
+class LazyRecords(Sequence):
+    """Records `raw`, each parsed with `parser` only once it is first accessed"""
+
+    _UNPARSED = object()
+
+    def __init__(self, raw: List[Record], parser: Callable[[Record], Any]) -> None:
+        self.raw = raw
+        self.parser = parser
+        self._parsed: List[Any] = [self._UNPARSED] * len(raw)
+
+    def __len__(self) -> int:
+        return len(self.raw)
+
+    def __iter__(self) -> Iterator[Any]:
+        for i in range(len(self.raw)):
+            yield self._get(i)
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:  # type: ignore
+        if isinstance(index, slice):
+            return [self._get(i) for i in range(*index.indices(len(self.raw)))]
+        return self._get(index)
+
+    def _get(self, index: int) -> Any:
+        parsed = self._parsed[index]
+        if parsed is self._UNPARSED:
+            parsed = self._parsed[index] = self.parser(self.raw[index])
+        return parsed
+
+
 @dataclass
 class Page:
-    records: List[Record]
+    records: LazyRecords
     _metadata: PageMetadata
 
     def __len__(self) -> int:
         return len(self.records)
 
-    def __iter__(self) -> Iterator[Record]:
+    def __iter__(self) -> Iterator[Any]:
         yield from self.records
 
-    def __getitem__(self, index: Union[int, slice]) -> Union[Record, List[Record]]:
+    def __getitem__(self, index: Union[int, slice]) -> Any:
         return self.records[index]
 
 
+class PageCache:
+    """A bounded LRU of parsed pages by index, holding up to `max_pages` pages
+    and `max_bytes` bytes (each unbounded if `None`)"""
+
+    def __init__(self, max_pages: Optional[int] = None, max_bytes: Optional[int] = None) -> None:
+        self.max_pages = max_pages
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._pages: "OrderedDict[int, Tuple[Page, int]]" = OrderedDict()
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+    def __contains__(self, index: int) -> bool:
+        return index in self._pages
+
+    def get(self, index: int) -> Optional[Page]:
+        with self._lock:
+            if index not in self._pages:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._pages.move_to_end(index)
+            return self._pages[index][0]
+
+    def put(self, index: int, page: Page, size: int = 0) -> None:
+        with self._lock:
+            if index in self._pages:
+                self.size -= self._pages.pop(index)[1]
+            self._pages[index] = (page, size)
+            self.size += size
+            while len(self._pages) > 1 and (
+                (self.max_pages is not None and len(self._pages) > self.max_pages)
+                or (self.max_bytes is not None and self.size > self.max_bytes)
+            ):
+                self.size -= self._pages.popitem(last=False)[1][1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pages.clear()
+            self.size = 0
+
+
+def save_cursor(cursor: Dict, path: Union[str, PathLike]) -> None:
+    """Atomically write `cursor` to `path`, as json"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(cursor, f)
+    os.replace(tmp_path, path)
+
+
+def load_cursor(path: Union[str, PathLike]) -> Optional[Dict]:
+    """Read a cursor from `path`, if it exists"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
 class PagedRecords(Generic[T]):
+    """Records of `url`, fetched a page at a time (see `PageOptions`).
+
+    Iteration starts at record `start`, and its progress is kept in `cursor`, which
+    is saved to `autosave` (if set) after each page. Use `from_cursor` to continue.
+    """
+
     def __init__(
         self,
         api: Api,
@@ -59,23 +237,247 @@ class PagedRecords(Generic[T]):
         params: Optional[Dict] = None,
         options: Optional[PageOptions] = None,
         record_parser: Optional[Callable[[Record], T]] = None,
+        start: int = 0,
+        autosave: Optional[Union[str, PathLike]] = None,
     ):
         self.api = api
         self.url = url
         self.params = params or {}
         self.options = options or PageOptions()
-        self.record_parser = record_parser or (lambda x: x)  # type: ignore
+        self.record_parser: Callable[[Record], T] = record_parser or (lambda x: x)  # type: ignore
+        self.start = start
+        self.position = start
+        self.start_key: Any = None
+        self.last_key: Any = None
+        self.drift = 0
+        self.duplicates = 0
+        self.autosave = autosave
+        self.metadata: Optional[PageMetadata] = None
+        self.cache: Optional[PageCache] = None
+        if self.options.cache_pages or self.options.cache_bytes:
+            self.cache = PageCache(self.options.cache_pages, self.options.cache_bytes)
 
-        # Fetch first page
-        self.page_index = 0
-        self.page = self.get_page(index=self.page_index, force=True)
+        # NOTE: the first page is only fetched once needed
+        self.page_index = start // self.per_page
+        self.page: Optional[Page] = None
+
+    @classmethod
+    def from_cursor(
+        cls,
+        api: Api,
+        cursor: Dict,
+        record_parser: Optional[Callable[[Record], T]] = None,
+        autosave: Optional[Union[str, PathLike]] = None,
+    ) -> "PagedRecords[T]":
+        """Get the records of `cursor`, continuing where it left off"""
+        records = cls(
+            api=api,
+            url=cursor["url"],
+            params=cursor["params"],
+            options=PageOptions(**cursor["options"]),
+            record_parser=record_parser,
+            start=cursor["position"],
+            autosave=autosave,
+        )
+        records.start_key = records.last_key = cursor.get("last_key")
+        return records
+
+    @property
+    def cursor(self) -> Dict:
+        """The position of the next record to iterate, and how to fetch it"""
+        return {
+            "url": self.url,
+            "params": self.params,
+            "options": asdict(self.options),
+            "position": self.position,
+            "last_key": self.last_key,
+        }
 
     def __len__(self) -> int:
         return self.total_records
 
     def __iter__(self) -> Iterator[T]:
-        for page_index in range(self.total_pages):
-            yield from self.get_page(page_index)  # type: ignore
+        return self._iter(raw=False)
+
+    def iter_raw(self) -> Iterator[Record]:
+        """Iterate the records as returned by the API, without parsing them"""
+        return self._iter(raw=True)
+
+    def export(
+        self,
+        file: Union[str, PathLike, BinaryIO],
+        format: str = "jsonl",
+        compress: Optional[bool] = None,
+        prefetch: int = 4,
+    ) -> int:
+        """Write the records as returned by the API, without parsing them, to `file`
+        (a path or binary stream), fetching up to `prefetch` pages concurrently.
+
+        Records are written as JSON lines, gzipped if `compress` (by default, if the
+        path ends with `.gz`). Returns the number of records written.
+        """
+        if format != "jsonl":
+            raise ValueError(f"Unsupported export format {format!r}, expected 'jsonl'")
+        if isinstance(file, (str, PathLike)):
+            if compress is None:
+                compress = str(file).endswith(".gz")
+            with gzip.open(file, "wb") if compress else open(file, "wb") as f:
+                return self._export_jsonl(f, prefetch)
+        if compress:
+            with gzip.GzipFile(fileobj=file, mode="wb") as f:
+                return self._export_jsonl(f, prefetch)
+        return self._export_jsonl(file, prefetch)
+
+    def _export_jsonl(self, f: Union[BinaryIO, gzip.GzipFile], prefetch: int) -> int:
+        dumps = self.api.codec.dumps
+        n = 0
+        for record in self._iter(raw=True, prefetch=prefetch):
+            f.write(dumps(record))
+            f.write(b"\n")
+            n += 1
+        return n
+
+    def _iter(self, raw: bool, prefetch: Optional[int] = None) -> Iterator[Any]:
+        prefetch = self.options.prefetch if prefetch is None else prefetch
+        pages: Iterator[Union[Page, Iterator[Record]]]
+        if self.options.keyset:
+            skip = 0
+            self.position = self.start
+            pages = self._iter_keyset(self.start_key)
+        elif self.options.adaptive and not (self.options.stream or prefetch):
+            skip = 0
+            self.position = self.start
+            pages = self._iter_adaptive(self.options.adaptive, offset=self.start)
+        else:
+            start_page, skip = divmod(self.start, self.per_page)
+            self.position = start_page * self.per_page
+            pages = self._iter_pages(start_page, prefetch)
+        dedupe_key = self.options.dedupe_key
+        seen: Set[Any] = set()
+        keyset_key = self.options.order_by if self.options.keyset else None
+        self._scan_total: Optional[int] = None
+        self.drift = self.duplicates = 0
+        for page in pages:
+            raws = page.records.raw if isinstance(page, Page) else page
+            for index, record in enumerate(raws):
+                self.position += 1
+                if skip:
+                    skip -= 1
+                    continue
+                if dedupe_key:
+                    key = record.get(dedupe_key)
+                    if key in seen:
+                        self.duplicates += 1
+                        continue
+                    seen.add(key)
+                if keyset_key:
+                    self.last_key = record[keyset_key]
+                yield record if raw else self._parse_item(page, index, record)
+            self._check_drift(page._metadata if isinstance(page, Page) else self.metadata)
+            if self.autosave:
+                save_cursor(self.cursor, self.autosave)
+
+    def _parse_item(self, page: Union[Page, Iterator[Record]], index: int, record: Record) -> T:
+        if isinstance(page, Page):
+            return page.records[index]
+        return self.record_parser(record)
+
+    def _check_drift(self, metadata: Optional[PageMetadata]) -> None:
+        """Warn if the total number of records changed since the scan started"""
+        if metadata is None:
+            return
+        if self._scan_total is None:
+            self._scan_total = metadata.totalRecords
+        elif metadata.totalRecords != self._scan_total + self.drift:
+            self.drift = metadata.totalRecords - self._scan_total
+            logger.warning(
+                f"Total records of {self.url} changed by {self.drift} while iterating, so records may"
+                " have been skipped or repeated"
+            )
+
+    def _iter_pages(self, start_page: int, prefetch: int = 0) -> Iterator[Union[Page, Iterator[Record]]]:
+        """Yield the pages from `start_page`, or when streaming, their unparsed records"""
+        if self.options.stream:
+            yield from self._iter_stream(start_page)
+        elif prefetch and self.total_pages - start_page > 1:
+            yield from self._fetch_pages(range(start_page, self.total_pages), prefetch)  # type: ignore
+        else:
+            for page_index in range(start_page, self.total_pages):
+                yield self.get_page(page_index)  # type: ignore
+
+    def _iter_keyset(self, last_key: Any) -> Iterator[Page]:
+        """Yield the pages of records after key `last_key` (or from the first, if `None`)"""
+        key = self.options.order_by
+        assert key, "keyset pagination requires order_by"
+        while True:
+            params = {**self._page_params(0), "offset": None, self.options.keyset_param: last_key}
+            page = self._parse_page(self.api.get(uri=self.url, params=params))
+            yield page
+            if len(page) < self.per_page:
+                return
+            last_key = page.records.raw[-1][key]
+
+    def _iter_adaptive(self, adaptive: AdaptivePageSize, offset: int) -> Iterator[Page]:
+        """Yield the pages from record `offset`, sized by `adaptive`"""
+        size = self.per_page
+        while self.metadata is None or offset < self.total_records:
+            params = {**self._page_params(0), "offset": offset, "limit": size}
+            t0 = monotonic()
+            nbytes: Optional[int] = None
+            if adaptive.max_bytes:
+                resp, nbytes = self.api.get_sized(uri=self.url, params=params)
+            else:
+                resp = self.api.get(uri=self.url, params=params)
+            elapsed = monotonic() - t0
+            page = self._parse_page(resp)
+            if not page:
+                return
+            size = adaptive.next_size(size, elapsed, nbytes)
+            offset += len(page)
+            yield page
+
+    def _fetch_pages(self, indices: Iterable[int], max_workers: Optional[int] = None) -> Iterator[Page]:
+        """Yield pages `indices` in order, fetching those not held concurrently"""
+        indices = list(indices)
+        held = {i: page for i, page in ((i, self._held_page(i)) for i in indices) if page is not None}
+        sized = self._sizes_pages
+        calls = (
+            ApiCall(
+                "GET",
+                self.url,
+                params=self._page_params(index),
+                parser=partial(self._parse_page, index=index, nbytes=None if sized else 0),
+                sized=sized,
+            )
+            for index in indices
+            if index not in held
+        )
+        results = self.api.map(calls, max_workers=max_workers or self.options.prefetch or None)
+        try:
+            for index in indices:
+                if index in held:
+                    yield held[index]
+                elif sized:
+                    page, nbytes = next(results).result()
+                    self._cache_page(index, page, nbytes)
+                    yield page
+                else:
+                    yield next(results).result()
+        finally:
+            results.close()
+
+    def _held_page(self, index: int) -> Optional[Page]:
+        if index == self.page_index and self.page is not None:
+            return self.page
+        return self.cache.get(index) if self.cache is not None else None
+
+    def _iter_stream(self, start_page: int = 0) -> Iterator[Iterator[Record]]:
+        page_index = start_page
+        while self.metadata is None or page_index < self.total_pages:
+            stream = self.api.get_stream(uri=self.url, params=self._page_params(page_index))
+            yield iter(stream)
+            self.metadata = ObjectMapper.tree_to_object(stream.metadata["_metadata"], PageMetadata)
+            page_index += 1
 
     def __getitem__(self, index: Union[int, slice]) -> Union[T, List[T]]:
         if isinstance(index, int):
@@ -85,6 +487,8 @@ class PagedRecords(Generic[T]):
         raise TypeError(f"Record index must be int or slice, not {type(index).__name__}")
 
     def _get_item(self, index: int) -> T:
+        if index < 0:
+            index += self.total_records
         if not 0 <= index < self.total_records:
             raise IndexError(f"Record index {index} out of range")
         page = index // self.per_page
@@ -92,25 +496,57 @@ class PagedRecords(Generic[T]):
         return self.get_page(page)[item]  # type: ignore
 
     def _get_slice(self, index: slice) -> List[T]:
-        # TODO: we could optimize this by not fetching unneeded pages, i.e. pages[0:1]
-        # would only need the first page fetched
-        records = [r for r in self]
-        return records[index]
+        # Group the indices by page, to only fetch (concurrently) the pages needed
+        items_by_page: Dict[int, List[int]] = {}
+        for i in range(*index.indices(self.total_records)):
+            items_by_page.setdefault(i // self.per_page, []).append(i % self.per_page)
+
+        records: List[T] = []
+        for page, (_, items) in zip(self._fetch_pages(items_by_page), items_by_page.items()):
+            records.extend(page[i] for i in items)  # type: ignore
+        return records
+
+    def _page_params(self, index: int) -> Dict:
+        return {**self.params, **self.options.to_api(index)}
+
+    @property
+    def _sizes_pages(self) -> bool:
+        """Whether pages are cached by size, so their response sizes are needed"""
+        return self.cache is not None and self.cache.max_bytes is not None
 
     def _get_page(self, index: int) -> Page:
-        resp = self.api.get(uri=self.url, params={**self.params, **self.options.to_api(index)})
-        page = ObjectMapper.tree_to_object(resp, Page)
-        # NOTE: this post processing is not ideal, but works for now
-        page.records = [self.record_parser(rec) for rec in page.records]  # type: ignore
+        params = self._page_params(index)
+        if self._sizes_pages:
+            resp, nbytes = self.api.get_sized(uri=self.url, params=params)
+            return self._parse_page(resp, index, nbytes)
+        return self._parse_page(self.api.get(uri=self.url, params=params), index)
+
+    def _parse_page(self, resp: Dict, index: Optional[int] = None, nbytes: Optional[int] = 0) -> Page:
+        """Parse page `index` from its json `resp`, and cache it, with its response size
+        `nbytes` (unless `None`, to be cached by the caller)"""
+        # NOTE: records are only parsed once accessed
+        page = Page(
+            records=LazyRecords(resp["records"], self.record_parser),
+            _metadata=ObjectMapper.tree_to_object(resp["_metadata"], PageMetadata),
+        )
+        self.metadata = page._metadata
+        if index is not None and nbytes is not None:
+            self._cache_page(index, page, nbytes)
         return page
 
+    def _cache_page(self, index: int, page: Page, nbytes: int) -> None:
+        if self.cache is not None:
+            self.cache.put(index, page, nbytes)
+
     def get_page(self, index: int, force: bool = False) -> Page:
         # Validate index
         if not force:
             if not 0 <= index < self.total_pages:
                 raise IndexError(f"Page index {index} out of range")
-            elif index == self.page_index:
-                return self.page
+            page = self._held_page(index)
+            if page is not None:
+                self.page_index, self.page = index, page
+                return page
 
         # Fetch page
         self.page_index = index
@@ -123,7 +559,17 @@ class PagedRecords(Generic[T]):
 
     @property
     def total_records(self) -> int:
-        return self.page._metadata.totalRecords
+        if self.metadata is None:
+            return self.get_page(index=self.page_index, force=True)._metadata.totalRecords
+        return self.metadata.totalRecords
+
+    def count(self) -> int:
+        """Get the total number of records, fetching a single record if not yet known"""
+        metadata = self.metadata
+        if metadata is None:
+            resp = self.api.get(uri=self.url, params={**self._page_params(0), "limit": 1})
+            metadata = self.metadata = ObjectMapper.tree_to_object(resp["_metadata"], PageMetadata)
+        return metadata.totalRecords
 
     @property
     def per_page(self) -> int:
@@ -140,61 +586,479 @@ class TimeSeriesPageMetadata:
 
 @dataclass
 class TimeSeriesPage:
-    records: List[Record]
+    records: List[DataPoint]
     meta: TimeSeriesPageMetadata
 
     def __len__(self) -> int:
         return len(self.records)
 
-    def __iter__(self) -> Iterator[Record]:
+    def __iter__(self) -> Iterator[DataPoint]:
         yield from self.records
 
-    def __getitem__(self, index: Union[int, slice]) -> Union[Record, List[Record]]:
+    def __getitem__(self, index: Union[int, slice]) -> Union[DataPoint, List[DataPoint]]:
         return self.records[index]
 
 
+def _with_query(url: str, **params: Any) -> str:
+    """Get `url`, with query parameters `params` set"""
+    parts = urlsplit(url)
+    query = dict(parse_qsl(parts.query, keep_blank_values=True))
+    query.update({k: str(v) for k, v in params.items()})
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+class _PageReader:
+    """Fetches the pages following `page` on a background thread, up to `depth` ahead"""
+
+    def __init__(self, series: "PagedTimeSeries", page: TimeSeriesPage, depth: int) -> None:
+        self._pages: "Queue[Union[TimeSeriesPage, Exception, None]]" = Queue(maxsize=depth)
+        self._stop = Event()
+        Thread(target=self._run, args=(series, page), daemon=True).start()
+
+    def _run(self, series: "PagedTimeSeries", page: TimeSeriesPage) -> None:
+        try:
+            url = series._relative_url(page.meta.next_page_url)
+            while url and not self._stop.is_set():
+                page = series._get_page(url=url)
+                self._put(page)
+                url = series._relative_url(page.meta.next_page_url)
+        except Exception as e:
+            self._put(e)
+        self._put(None)
+
+    def _put(self, item: Union[TimeSeriesPage, Exception, None]) -> None:
+        # Wait for room, unless the consumer is gone
+        while not self._stop.is_set():
+            try:
+                self._pages.put(item, timeout=0.1)
+                return
+            except Full:
+                pass
+
+    def __iter__(self) -> Iterator[TimeSeriesPage]:
+        while True:
+            item = self._pages.get()
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+    def close(self) -> None:
+        self._stop.set()
+
+
 class PagedTimeSeries:
-    def __init__(self, api: Api, url: str, params: Optional[Dict] = None, per_page: int = 1000):
+    """Time series points of `url`, fetched a page at a time by following each
+    page's `next_page_url`. With `stream`, points are decoded one at a time while
+    iterating. With `read_ahead`, up to that many next pages are fetched on a
+    background thread while the current one is consumed.
+
+    With `adaptive`, the page size is adapted while iterating (without `stream`
+    or `read_ahead`), starting at `per_page`. With `value_type`, values are
+    strictly parsed as that type, rather than having their type inferred.
+
+    Iteration starts at page `page_url` (by default, the first page), skipping its
+    first `skip` points, and its progress is kept in `cursor`, which is saved to
+    `autosave` (if set) after each page. Use `from_cursor` to continue.
+    """
+
+    def __init__(
+        self,
+        api: Api,
+        url: str,
+        params: Optional[Dict] = None,
+        per_page: int = 1000,
+        stream: bool = False,
+        read_ahead: int = 0,
+        page_url: Optional[str] = None,
+        skip: int = 0,
+        autosave: Optional[Union[str, PathLike]] = None,
+        adaptive: Optional[AdaptivePageSize] = None,
+        value_type: Optional[FieldValueType] = None,
+    ):
+        assert read_ahead >= 0, f"read_ahead must be a non-negative integer, not {read_ahead}"
         self.api = api
+        self.value_type = value_type
+        self._parse_value = value_parser(value_type)
         self.url = url
         self.params = params or {}
         self.params.setdefault("limit", per_page)
+        self.stream = stream
+        self.read_ahead = read_ahead
+        self.adaptive = adaptive
+        self.page_size = self.params["limit"]
+        self.elapsed = 0.0
+        self.start_url = page_url
+        self.start_skip = skip
+        self.autosave = autosave
+        self.page_url = page_url
+        self.skip = skip
+        self.next_record_time: Optional[int] = None
 
-        # Fetch first page
+        # NOTE: the first page is only fetched once needed
         self.page_index = 0
-        self.page = self._get_page(url=self.url, params=self.params)
+        self._page: Optional[TimeSeriesPage] = None
+
+    @classmethod
+    def from_cursor(
+        cls, api: Api, cursor: Dict, autosave: Optional[Union[str, PathLike]] = None, **kwargs
+    ) -> "PagedTimeSeries":
+        """Get the time series of `cursor`, continuing where it left off"""
+        series = cls(
+            api=api,
+            url=cursor["url"],
+            params=cursor["params"],
+            page_url=cursor["next_page_url"],
+            skip=cursor["skip"],
+            autosave=autosave,
+            **kwargs,
+        )
+        series.next_record_time = cursor["next_record_time"]
+        return series
 
-    def __iter__(self):
+    @property
+    def cursor(self) -> Dict:
+        """The page to continue from, and the number of its points already iterated"""
+        return {
+            "url": self.url,
+            "params": self.params,
+            "next_page_url": self.page_url,
+            "next_record_time": self.next_record_time,
+            "skip": self.skip,
+        }
+
+    def _start(self) -> Tuple[str, Optional[Dict]]:
+        if self.start_url:
+            return self.start_url, None
+        return self.url, self.params
+
+    def __iter__(self) -> Iterator[DataPoint]:
+        self.page_url, self.skip = self.start_url, 0
+        skip = self.start_skip
+        for points, get_meta in self._iter_pages():
+            for point in points:
+                self.skip += 1
+                if skip:
+                    skip -= 1
+                else:
+                    yield point
+
+            # NOTE: the last page is kept, with all its points skipped
+            meta = get_meta()
+            self.next_record_time = meta.next_record_time
+            if meta.next_page_url:
+                self.page_url, self.skip = self._relative_url(meta.next_page_url), 0
+            if self.autosave:
+                save_cursor(self.cursor, self.autosave)
+
+    def _iter_pages(self) -> Iterator[Tuple[Iterable[DataPoint], Callable[[], TimeSeriesPageMetadata]]]:
+        """Yield each page's points, and a function to get its metadata once they are consumed"""
+        if self.stream:
+            yield from self._iter_stream()
+            return
         # HACK: Reset to first page
         if self.page_index != 0:
             self.page_index = 0
-            self.page = self._get_page(url=self.url, params=self.params)
-        yield from self.page
-        while self.next_page_url:
-            yield from self.get_next_page()
+            self._page = None
+        if not self.read_ahead:
+            yield self.page, lambda: self.page.meta
+            while self.next_page_url:
+                yield self.get_next_page(), lambda: self.page.meta
+            return
+
+        reader = _PageReader(self, self.page, depth=self.read_ahead)
+        try:
+            yield self.page, lambda: self.page.meta
+            for page in reader:
+                self.page_index += 1
+                self.page = page
+                yield page, lambda: self.page.meta
+        finally:
+            reader.close()
 
     def _get_page(self, url: str, params: Optional[Dict] = None) -> TimeSeriesPage:
+        t0 = monotonic()
         resp = self.api.get(url, params=params)
-        page = ObjectMapper.tree_to_object(resp, TimeSeriesPage)
-        # NOTE: this post processing is not ideal, but works for now
-        page.records = [self._record_parser(rec) for rec in page.records]  # type: ignore
-        return page
+        self.elapsed = monotonic() - t0
+        return TimeSeriesPage(
+            records=parse_time_series(resp["records"], self.value_type),
+            meta=ObjectMapper.tree_to_object(resp["meta"], TimeSeriesPageMetadata),
+        )
 
     def _record_parser(self, record: Dict) -> DataPoint:
-        return Parsers.datetime(record["event_time"]), Parsers.unknown(record["value"])
+        return Parsers.datetime(record["event_time"]), self._parse_value(record["value"])
 
     def get_next_page(self) -> TimeSeriesPage:
         if not self.next_page_url:
             raise IndexError("No next page")
+        url = self.next_page_url
+        if self.adaptive is not None:
+            self.page_size = self.adaptive.next_size(self.page_size, self.elapsed)
+            url = _with_query(url, limit=self.page_size)
         self.page_index += 1
-        self.page = self._get_page(url=self.next_page_url)
+        self.page = self._get_page(url=url)
         return self.page
 
+    def _iter_stream(self) -> Iterator[Tuple[Iterable[DataPoint], Callable[[], TimeSeriesPageMetadata]]]:
+        url: Optional[str]
+        url, params = self._start()
+        while url:
+            stream = self.api.get_stream(url, params=params)
+
+            def get_meta() -> TimeSeriesPageMetadata:
+                return ObjectMapper.tree_to_object(stream.metadata["meta"], TimeSeriesPageMetadata)
+
+            yield (self._record_parser(record) for record in stream), get_meta
+            url, params = self._relative_url(get_meta().next_page_url), None
+
+    def _relative_url(self, url: Optional[str]) -> Optional[str]:
+        if not url:
+            return None
+        return url.replace(self.api.base_url, "")
+
+    @property
+    def page(self) -> TimeSeriesPage:
+        if self._page is None:
+            self._page = self._get_page(*self._start())
+        return self._page
+
+    @page.setter
+    def page(self, page: TimeSeriesPage) -> None:
+        self._page = page
+
     @property
     def next_page_url(self) -> Optional[str]:
-        if not self.page.meta.next_page_url:
-            return None
-        return self.page.meta.next_page_url.replace(self.api.base_url, "")
+        return self._relative_url(self.page.meta.next_page_url)
+
+    @property
+    def per_page(self) -> int:
+        return self.params["limit"]
+
+
+class ShardedTimeSeries:
+    """Time series points of `url` from `start_time` to `end_time`, fetched as
+    shards of sub-ranges, with up to `max_workers` shards fetched at once.
+
+    The first page is fetched alone, and the density of its points sizes the
+    shards of the rest of the range to about `pages_per_shard` pages each (and
+    at most `max_shards` in all). Points are yielded in order, and without
+    duplicates at the shard boundaries.
+    """
+
+    def __init__(
+        self,
+        api: Api,
+        url: str,
+        start_time: datetime,
+        end_time: datetime,
+        params: Optional[Dict] = None,
+        per_page: int = 1000,
+        max_workers: int = 4,
+        pages_per_shard: int = 4,
+        max_shards: int = 1000,
+        value_type: Optional[FieldValueType] = None,
+    ):
+        assert max_workers > 0, f"max_workers must be a positive integer, not {max_workers}"
+        self.api = api
+        self.url = url
+        self.start = int(start_time.timestamp())
+        self.end = int(end_time.timestamp())
+        self.params = params or {}
+        self.per_page = per_page
+        self.max_workers = max_workers
+        self.pages_per_shard = pages_per_shard
+        self.max_shards = max_shards
+        self.value_type = value_type
+        self.shards: List[Tuple[int, int]] = []
+
+    def _series(self, start: int, end: int) -> PagedTimeSeries:
+        return PagedTimeSeries(
+            api=self.api,
+            url=self.url,
+            params={**self.params, "timeStart": start, "timeEnd": end},
+            per_page=self.per_page,
+            value_type=self.value_type,
+        )
+
+    def _fetch_shard(self, start: int, end: int) -> List[DataPoint]:
+        points = list(self._series(start, end))
+        if end == self.end:
+            return points
+        # Points at the end of the shard belong to the next one
+        return [p for p in points if p[0].timestamp() < end]
+
+    def _plan(self, points: List[DataPoint]) -> List[Tuple[int, int]]:
+        """Split the rest of the range, after the first page's `points`, into shards"""
+        # NOTE: the shards start at the last point's second, since more points may share it
+        start = int(points[-1][0].timestamp())
+        density = len(points) / max(start - self.start, 1)
+        seconds = max(ceil(self.per_page * self.pages_per_shard / density), 1)
+        seconds = max(seconds, ceil((self.end - start) / self.max_shards))
+        return [(t, min(t + seconds, self.end)) for t in range(start, self.end, seconds)]
+
+    def __iter__(self) -> Iterator[DataPoint]:
+        first = self._series(self.start, self.end)
+        points = first.page.records
+        yield from points
+        if not first.next_page_url or not points:
+            return
+
+        self.shards = self._plan(points)
+        logger.debug(f"Fetching {self.url} in {len(self.shards)} shards")
+        last_time = points[-1][0]
+        shards = iter(self.shards)
+        pending: Deque[Future] = deque()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            try:
+                while True:
+                    for shard in shards:
+                        pending.append(executor.submit(self._fetch_shard, *shard))
+                        if len(pending) >= 2 * self.max_workers:
+                            break
+                    if not pending:
+                        return
+                    for point in pending.popleft().result():
+                        if point[0] > last_time:
+                            last_time = point[0]
+                            yield point
+            finally:
+                for future in pending:
+                    future.cancel()
+
+
+class AsyncPagedRecords(Generic[T]):
+    """Asyncio counterpart to `PagedRecords`. Once the first page reports the
+    total number of records, up to `concurrency` of the remaining pages are
+    fetched concurrently, while records are still yielded in order.
+    """
+
+    def __init__(
+        self,
+        api: AsyncApi,
+        url: str,
+        params: Optional[Dict] = None,
+        options: Optional[PageOptions] = None,
+        record_parser: Optional[Callable[[Record], T]] = None,
+        concurrency: int = 4,
+    ):
+        assert concurrency > 0, f"concurrency must be a positive integer, not {concurrency}"
+        self.api = api
+        self.url = url
+        self.params = params or {}
+        self.options = options or PageOptions()
+        self.record_parser: Callable[[Record], T] = record_parser or (lambda x: x)  # type: ignore
+        self.concurrency = concurrency
+
+    async def __aiter__(self) -> AsyncIterator[T]:
+        first_page = await self.get_page(0)
+        for record in first_page:
+            yield record  # type: ignore
+        total_pages = ceil(first_page._metadata.totalRecords / self.per_page)
+
+        # Keep a window of pages in flight, consuming them in order
+        pending: Deque[asyncio.Task] = deque()
+        next_index = 1
+        try:
+            while pending or next_index < total_pages:
+                while next_index < total_pages and len(pending) < self.concurrency:
+                    pending.append(asyncio.ensure_future(self.get_page(next_index)))
+                    next_index += 1
+                page = await pending.popleft()
+                for record in page:
+                    yield record  # type: ignore
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def get_page(self, index: int) -> Page:
+        resp = await self.api.get(self.url, params={**self.params, **self.options.to_api(index)})
+        return Page(
+            records=LazyRecords(resp["records"], self.record_parser),
+            _metadata=ObjectMapper.tree_to_object(resp["_metadata"], PageMetadata),
+        )
+
+    async def total_records(self) -> int:
+        return (await self.get_page(0))._metadata.totalRecords
+
+    @property
+    def per_page(self) -> int:
+        return self.options.per_page
+
+
+class AsyncPagedTimeSeries:
+    """Asyncio counterpart to `PagedTimeSeries`. With `read_ahead`, up to that
+    many next pages are fetched by a task while the current one is consumed, and
+    with `value_type`, values are strictly parsed as that type."""
+
+    def __init__(
+        self,
+        api: AsyncApi,
+        url: str,
+        params: Optional[Dict] = None,
+        per_page: int = 1000,
+        read_ahead: int = 0,
+        value_type: Optional[FieldValueType] = None,
+    ):
+        assert read_ahead >= 0, f"read_ahead must be a non-negative integer, not {read_ahead}"
+        self.api = api
+        self.value_type = value_type
+        self.url = url
+        self.params = params or {}
+        self.params.setdefault("limit", per_page)
+        self.read_ahead = read_ahead
+
+    async def __aiter__(self) -> AsyncIterator[DataPoint]:
+        if self.read_ahead:
+            async for page in self._read_ahead():
+                for record in page:
+                    yield record  # type: ignore
+            return
+        page = await self._get_page(url=self.url, params=self.params)
+        for record in page:
+            yield record  # type: ignore
+        while page.meta.next_page_url:
+            page = await self._get_page(url=page.meta.next_page_url.replace(self.api.base_url, ""))
+            for record in page:
+                yield record  # type: ignore
+
+    async def _read_ahead(self) -> AsyncIterator[TimeSeriesPage]:
+        pages: "asyncio.Queue[Union[TimeSeriesPage, Exception, None]]" = asyncio.Queue(
+            maxsize=self.read_ahead
+        )
+
+        async def fetch() -> None:
+            url: Optional[str] = self.url
+            params: Optional[Dict] = self.params
+            try:
+                while url:
+                    page = await self._get_page(url=url, params=params)
+                    await pages.put(page)
+                    next_page_url = page.meta.next_page_url
+                    url = next_page_url.replace(self.api.base_url, "") if next_page_url else None
+                    params = None
+            except Exception as e:
+                await pages.put(e)
+            await pages.put(None)
+
+        task = asyncio.ensure_future(fetch())
+        try:
+            while True:
+                item = await pages.get()
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            task.cancel()
+
+    async def _get_page(self, url: str, params: Optional[Dict] = None) -> TimeSeriesPage:
+        resp = await self.api.get(url, params=params)
+        return TimeSeriesPage(
+            records=parse_time_series(resp["records"], self.value_type),
+            meta=ObjectMapper.tree_to_object(resp["meta"], TimeSeriesPageMetadata),
+        )
 
     @property
     def per_page(self) -> int:
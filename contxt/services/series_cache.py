@@ -0,0 +1,229 @@
+import pickle
+import sqlite3
+from datetime import datetime, timedelta, timezone
+from os import PathLike
+from threading import RLock
+from time import time
+from typing import Iterable, List, Optional, Tuple, Union
+
+from ..models.iot import Field, Window
+from ..utils import make_logger
+from .pagination import DataPoint
+
+logger = make_logger(__name__)
+
+# A time series, by output id, field human name, window, and the value type its
+# values are parsed as (or "", if inferred)
+SeriesKey = Tuple[str, str, int, str]
+
+# A half-open range of time, in (whole) seconds since the epoch
+TimeRange = Tuple[int, int]
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS series (
+    id INTEGER PRIMARY KEY,
+    output_id TEXT NOT NULL,
+    field TEXT NOT NULL,
+    window_value INTEGER NOT NULL,
+    value_type TEXT NOT NULL,
+    used_at REAL NOT NULL,
+    UNIQUE (output_id, field, window_value, value_type)
+);
+CREATE TABLE IF NOT EXISTS points (
+    series INTEGER NOT NULL,
+    time INTEGER NOT NULL,
+    value BLOB,
+    PRIMARY KEY (series, time)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS ranges (
+    series INTEGER NOT NULL,
+    start_time INTEGER NOT NULL,
+    end_time INTEGER NOT NULL,
+    fetched_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ranges_series ON ranges (series, start_time);
+"""
+
+
+def _to_micros(t: datetime) -> int:
+    return (t - EPOCH) // timedelta(microseconds=1)
+
+
+def _from_micros(t: int) -> datetime:
+    return EPOCH + timedelta(microseconds=t)
+
+
+class TimeSeriesCache:
+    """A persistent cache of time series points, in a SQLite database at `path`
+    (by default, in memory), for `IotService`.
+
+    Points are stored by series, i.e. field, window, and the value type they were
+    parsed as (see `key`), along with the half-open time ranges they cover, so
+    that only the gaps in a requested range need to be fetched. A range is only
+    covered up to the time it was fetched, since later points may still arrive,
+    and is dropped once older than `retention` seconds (if set). Once more than
+    `max_points` points are stored, the least recently used series are evicted.
+
+    Values are pickled, as by `ResponseCache`'s shelf, so that they are returned as
+    parsed (e.g. as datetimes or tuples), exactly as when fetched.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, PathLike] = ":memory:",
+        retention: Optional[float] = None,
+        max_points: Optional[int] = None,
+    ) -> None:
+        self.path = path
+        self.retention = retention
+        self.max_points = max_points
+        self.hits = 0
+        self.misses = 0
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        self._lock = RLock()
+
+    @staticmethod
+    def key(field: Field, window: Window, typed: bool = False) -> SeriesKey:
+        """Get the key of the series of `field` and `window`, with values parsed as
+        the field's value type if `typed`"""
+        value_type = field.value_type.value if typed and field.value_type else ""
+        return str(field.output_id), str(field.field_human_name), window.value, value_type
+
+    def _series_id(self, key: SeriesKey) -> int:
+        row = self._db.execute(
+            "SELECT id FROM series WHERE output_id = ? AND field = ? AND window_value = ?"
+            " AND value_type = ?",
+            key,
+        ).fetchone()
+        if row is None:
+            cursor = self._db.execute(
+                "INSERT INTO series (output_id, field, window_value, value_type, used_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (*key, time()),
+            )
+            assert cursor.lastrowid is not None
+            return cursor.lastrowid
+        self._db.execute("UPDATE series SET used_at = ? WHERE id = ?", (time(), row[0]))
+        return row[0]
+
+    def gaps(self, key: SeriesKey, start: int, end: int) -> List[TimeRange]:
+        """Get the ranges within [`start`, `end`) not covered by the cache"""
+        with self._lock, self._db:
+            self._expire()
+            series = self._series_id(key)
+            ranges = self._db.execute(
+                "SELECT start_time, end_time FROM ranges WHERE series = ? AND end_time > ?"
+                " AND start_time < ? ORDER BY start_time",
+                (series, start, end),
+            ).fetchall()
+        gaps = []
+        for range_start, range_end in ranges:
+            if range_start > start:
+                gaps.append((start, range_start))
+            start = max(start, range_end)
+        if start < end:
+            gaps.append((start, end))
+        if gaps:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return gaps
+
+    def get(self, key: SeriesKey, start: int, end: int) -> List[DataPoint]:
+        """Get the cached points within [`start`, `end`)"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT p.time, p.value FROM points p JOIN series s ON p.series = s.id"
+                " WHERE s.output_id = ? AND s.field = ? AND s.window_value = ? AND s.value_type = ?"
+                " AND p.time >= ? AND p.time < ? ORDER BY p.time",
+                (*key, start * 1_000_000, end * 1_000_000),
+            ).fetchall()
+        return [(_from_micros(t), pickle.loads(value)) for t, value in rows]
+
+    def put(self, key: SeriesKey, start: int, end: int, points: Iterable[DataPoint]) -> None:
+        """Store the `points` fetched for range [`start`, `end`), which replace those cached"""
+        # NOTE: consume the points (which may still be fetching) before locking the cache
+        fetched_at = time()
+        end = min(end, int(fetched_at))
+        lo, hi = start * 1_000_000, end * 1_000_000
+        rows = [
+            (t, pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+            for t, value in ((_to_micros(t), v) for t, v in points)
+            if lo <= t < hi
+        ]
+        with self._lock, self._db:
+            series = self._series_id(key)
+            self._db.execute(
+                "DELETE FROM points WHERE series = ? AND time >= ? AND time < ?", (series, lo, hi)
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO points (series, time, value) VALUES (?, ?, ?)",
+                ((series, t, value) for t, value in rows),
+            )
+            if start < end:
+                self._cover(series, start, end, fetched_at)
+            self._evict(series)
+
+    def _cover(self, series: int, start: int, end: int, fetched_at: float) -> None:
+        # Keep ranges disjoint, by trimming those the new range overlaps
+        overlaps = self._db.execute(
+            "SELECT rowid, start_time, end_time, fetched_at FROM ranges"
+            " WHERE series = ? AND end_time > ? AND start_time < ?",
+            (series, start, end),
+        ).fetchall()
+        for rowid, range_start, range_end, range_fetched_at in overlaps:
+            self._db.execute("DELETE FROM ranges WHERE rowid = ?", (rowid,))
+            for piece in ((range_start, start), (end, range_end)):
+                if piece[0] < piece[1]:
+                    self._db.execute(
+                        "INSERT INTO ranges VALUES (?, ?, ?, ?)", (series, *piece, range_fetched_at)
+                    )
+        self._db.execute("INSERT INTO ranges VALUES (?, ?, ?, ?)", (series, start, end, fetched_at))
+
+    def _expire(self) -> None:
+        if self.retention is None:
+            return
+        expired = self._db.execute(
+            "SELECT rowid, series, start_time, end_time FROM ranges WHERE fetched_at < ?",
+            (time() - self.retention,),
+        ).fetchall()
+        for rowid, series, start, end in expired:
+            self._db.execute(
+                "DELETE FROM points WHERE series = ? AND time >= ? AND time < ?",
+                (series, start * 1_000_000, end * 1_000_000),
+            )
+            self._db.execute("DELETE FROM ranges WHERE rowid = ?", (rowid,))
+        if expired:
+            logger.debug(f"Expired {len(expired)} cached time series ranges")
+
+    def _evict(self, keep: int) -> None:
+        """Evict the least recently used series (other than `keep`) while over `max_points`"""
+        if self.max_points is None:
+            return
+        (count,) = self._db.execute("SELECT COUNT(*) FROM points").fetchone()
+        while count > self.max_points:
+            row = self._db.execute(
+                "SELECT id FROM series WHERE id != ? ORDER BY used_at LIMIT 1", (keep,)
+            ).fetchone()
+            if row is None:
+                break
+            for table, column in (("points", "series"), ("ranges", "series"), ("series", "id")):
+                self._db.execute(f"DELETE FROM {table} WHERE {column} = ?", row)
+            (count,) = self._db.execute("SELECT COUNT(*) FROM points").fetchone()
+
+    def clear(self) -> None:
+        with self._lock, self._db:
+            for table in ("points", "ranges", "series"):
+                self._db.execute(f"DELETE FROM {table}")
+
+    def close(self) -> None:
+        self._db.close()
+
+    def info(self) -> Tuple[int, int, int]:
+        """Get the number of hits, misses, and points"""
+        with self._lock:
+            (count,) = self._db.execute("SELECT COUNT(*) FROM points").fetchone()
+        return self.hits, self.misses, count
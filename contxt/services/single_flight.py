@@ -0,0 +1,48 @@
+from concurrent.futures import Future
+from threading import Lock
+from typing import Callable, Dict, Hashable, TypeVar
+
+from ..utils import make_logger
+
+logger = make_logger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key, so only the first one runs
+    and the others wait for, and share, its result (or exception)."""
+
+    def __init__(self) -> None:
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        """Call `fn`, unless a call with key `key` is already in flight"""
+        with self._lock:
+            joined = self._calls.get(key)
+            if joined is None:
+                future: Future = Future()
+                self._calls[key] = future
+        if joined is not None:
+            logger.debug(f"Joining in-flight call {key}")
+            return joined.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+# Process-wide, to coalesce calls from all `Api` instances
+in_flight = SingleFlight()
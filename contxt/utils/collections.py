@@ -1,8 +1,15 @@
 from collections import defaultdict
-from typing import Callable, Dict, Iterable, Iterator, List, TypeVar
+from heapq import merge
+from itertools import groupby, islice
+from operator import itemgetter
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, TypeVar
 
 T = TypeVar("T")
 U = TypeVar("U")
+K = TypeVar("K")
+
+# How `merge_series` fills in the values of series missing at a key
+FILLS = ("none", "value", "previous")
 
 
 class IteratorWrapper(Iterable[T]):
@@ -28,3 +35,64 @@ def partition_by(iterable: Iterable[T], key: Callable[[T], U]) -> Dict[U, List[T
 
 def unique(lst: List) -> bool:
     return len(lst) == len(set(lst))
+
+
+def _tagged(name: str, series: Iterable[Tuple[K, T]]) -> Iterator[Tuple[K, str, T]]:
+    for key, value in series:
+        yield key, name, value
+
+
+def merge_series(
+    series: Mapping[str, Iterable[Tuple[K, T]]], fill: str = "none", fill_value: Optional[T] = None
+) -> Iterator[Tuple[K, Dict[str, Optional[T]]]]:
+    """
+    Merges key-ordered series of (key, value) pairs, such as time series, into rows
+    of each key and the values of the series at that key. The series are consumed
+    lazily, one item at a time.
+    :param series: series to merge, by name
+    :param fill: how to fill values of series missing at a key: "none" leaves them
+    out of the row, "value" uses `fill_value`, and "previous" the series' previous
+    value (or `fill_value`, before its first)
+    :param fill_value: value for missing values
+    :return: iterator of (key, row) in order of key
+    """
+    assert fill in FILLS, f"fill must be one of {FILLS}, not {fill!r}"
+    names = list(series)
+    merged = merge(*(_tagged(name, s) for name, s in series.items()), key=itemgetter(0))
+    previous: Dict[str, Optional[T]] = {}
+    for key, items in groupby(merged, key=itemgetter(0)):
+        row: Dict[str, Optional[T]] = {name: value for _, name, value in items}
+        if fill == "previous":
+            previous.update(row)
+            row = {name: previous.get(name, fill_value) for name in names}
+        elif fill == "value":
+            row = {name: row.get(name, fill_value) for name in names}
+        yield key, row
+
+
+def merge_series_columns(
+    series: Mapping[str, Iterable[Tuple[K, T]]],
+    size: int = 1000,
+    key_name: str = "timestamp",
+    fill: str = "value",
+    fill_value: Any = None,
+) -> Iterator[Dict[str, List]]:
+    """
+    Merges key-ordered series like `merge_series`, but into chunks of columns
+    :param series: series to merge, by name
+    :param size: maximum number of rows per chunk
+    :param key_name: name of the column of keys
+    :param fill: how to fill missing values (see `merge_series`), except "none"
+    :param fill_value: value for missing values
+    :return: iterator of chunks, of the column of keys and each series' column
+    """
+    assert fill != "none", "Columns require missing values to be filled"
+    rows = merge_series(series, fill=fill, fill_value=fill_value)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        columns: Dict[str, List] = {key_name: [key for key, _ in chunk]}
+        for name in series:
+            columns[name] = [row[name] for _, row in chunk]
+        yield columns
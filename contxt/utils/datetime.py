@@ -19,7 +19,18 @@ def datetime_zulu_format_short(dt: datetime):
     return datetime_utc_check(dt).strftime("%Y-%m-%dT%H:%MZ")
 
 
-def datetime_zulu_parse(timestamp):
+def datetime_zulu_parse(timestamp: str) -> datetime:
+    # Fast path for the fixed layout with milli- or microseconds, i.e. 2021-01-01T00:00:00.000Z
+    if (
+        len(timestamp) in (24, 27)
+        and timestamp[10] == "T"
+        and timestamp[19] == "."
+        and timestamp[-1] == "Z"
+    ):
+        try:
+            return datetime.fromisoformat(timestamp[:-1]).replace(tzinfo=timezone.utc)
+        except ValueError:
+            pass
     return datetime.strptime(timestamp, "%Y-%m-%dT%H:%M:%S.%fZ").replace(tzinfo=timezone.utc)
 
 
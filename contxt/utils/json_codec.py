@@ -0,0 +1,85 @@
+import json
+from typing import Any, Optional, Union
+
+from . import make_logger
+
+logger = make_logger(__name__)
+
+
+class JsonCodec:
+    """Encodes and decodes JSON bodies, using the standard library"""
+
+    name = "json"
+
+    def dumps(self, obj: Any) -> bytes:
+        """Encode `obj` as JSON. Bytes are assumed to be encoded already."""
+        if isinstance(obj, bytes):
+            return obj
+        return json.dumps(obj).encode()
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return json.loads(data)
+
+
+class OrjsonCodec(JsonCodec):
+    """Encodes and decodes JSON bodies, using `orjson`"""
+
+    name = "orjson"
+
+    def __init__(self) -> None:
+        import orjson  # type: ignore[import]
+
+        self._orjson = orjson
+
+    def dumps(self, obj: Any) -> bytes:
+        if isinstance(obj, bytes):
+            return obj
+        try:
+            return self._orjson.dumps(obj)
+        except TypeError:
+            # NOTE: orjson is stricter, i.e. on non-str keys and big ints
+            return super().dumps(obj)
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return self._orjson.loads(data)
+
+
+class UjsonCodec(JsonCodec):
+    """Encodes and decodes JSON bodies, using `ujson`"""
+
+    name = "ujson"
+
+    def __init__(self) -> None:
+        import ujson  # type: ignore[import]
+
+        self._ujson = ujson
+
+    def dumps(self, obj: Any) -> bytes:
+        if isinstance(obj, bytes):
+            return obj
+        try:
+            return self._ujson.dumps(obj, ensure_ascii=False).encode()
+        except (OverflowError, TypeError):
+            return super().dumps(obj)
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return self._ujson.loads(data)
+
+
+_default_codec: Optional[JsonCodec] = None
+
+
+def default_codec() -> JsonCodec:
+    """Get the fastest available codec, preferring orjson, then ujson, then the standard library"""
+    global _default_codec
+    if _default_codec is None:
+        for codec_cls in (OrjsonCodec, UjsonCodec):
+            try:
+                _default_codec = codec_cls()
+                break
+            except ImportError:
+                pass
+        else:
+            _default_codec = JsonCodec()
+        logger.debug(f"Using {_default_codec.name} to encode and decode JSON")
+    return _default_codec
@@ -0,0 +1,113 @@
+from codecs import getincrementaldecoder
+from json import JSONDecodeError, JSONDecoder
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+_WHITESPACE = " \t\n\r"
+_DELIMITERS = _WHITESPACE + ",:]}"
+
+
+class JsonRecordStream:
+    """Incrementally decodes a JSON object from the byte `chunks`, yielding the
+    items of its array member `key` one at a time as they arrive. All other
+    members are collected in `metadata`, which is complete once iteration ends.
+
+    Only the current item (and one chunk) is held in memory, rather than the
+    whole document. `on_close` is called once the stream is exhausted or closed.
+    """
+
+    def __init__(
+        self,
+        chunks: Iterable[bytes],
+        key: str = "records",
+        on_close: Optional[Callable[[], None]] = None,
+    ) -> None:
+        self.key = key
+        self.metadata: Dict[str, Any] = {}
+        self._chunks = iter(chunks)
+        self._on_close = on_close
+        self._text = getincrementaldecoder("utf-8")()
+        self._decoder = JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._started = False
+        self._exhausted = False
+
+    def __iter__(self) -> Iterator[Any]:
+        if self._started:
+            raise RuntimeError("JsonRecordStream can only be iterated once")
+        self._started = True
+        try:
+            yield from self._parse()
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        if self._on_close:
+            self._on_close()
+            self._on_close = None
+
+    def _fill(self) -> bool:
+        # Drop consumed text, then append the next chunk (if any)
+        self._buffer = self._buffer[self._pos :]
+        self._pos = 0
+        for chunk in self._chunks:
+            text = self._text.decode(chunk)
+            if text:
+                self._buffer += text
+                return True
+        self._exhausted = True
+        text = self._text.decode(b"", final=True)
+        self._buffer += text
+        return bool(text)
+
+    def _peek(self) -> str:
+        # Skip whitespace and return the next character, without consuming it
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON stream")
+
+    def _expect(self, chars: str) -> str:
+        char = self._peek()
+        if char not in chars:
+            raise ValueError(f"Expected one of {chars!r} in JSON stream, not {char!r}")
+        self._pos += 1
+        return char
+
+    def _value(self) -> Any:
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+                # NOTE: a number that is not followed by a delimiter may be truncated
+                if self._exhausted or (end < len(self._buffer) and self._buffer[end] in _DELIMITERS):
+                    self._pos = end
+                    return value
+            except JSONDecodeError:
+                if self._exhausted:
+                    raise ValueError("Invalid or truncated value in JSON stream")
+            self._fill()
+
+    def _parse(self) -> Iterator[Any]:
+        self._expect("{")
+        if self._peek() == "}":
+            return
+        while True:
+            name = self._value()
+            self._expect(":")
+            if name == self.key and self._peek() == "[":
+                self._expect("[")
+                if self._peek() == "]":
+                    self._expect("]")
+                else:
+                    while True:
+                        yield self._value()
+                        if self._expect(",]") == "]":
+                            break
+            else:
+                self.metadata[name] = self._value()
+            if self._expect(",}") == "}":
+                return
@@ -3,7 +3,7 @@ from datetime import date, datetime
 from enum import Enum
 from json import dump, dumps
 from pathlib import Path
-from typing import Any, Callable, Iterable, Optional
+from typing import Any, Callable, Iterable, List, Optional
 
 from tabulate import tabulate
 
@@ -192,6 +192,35 @@ class Serializer:
                 # Write dict
                 writer.writerow(d)
 
+    @staticmethod
+    def to_csv_rows(
+        rows: Iterable[Any], path: Path, fieldnames: List[str], header: bool = True, **kwargs
+    ):
+        """Serializes `rows` to CSV, one row at a time, so that they need not fit in memory.
+
+        :param rows: rows to serialize
+        :type rows: Iterable[Any]
+        :param path: path to export
+        :type path: Path
+        :param fieldnames: columns of the rows
+        :type fieldnames: List[str]
+        :param header: write header row, defaults to True
+        :param header: bool, optional
+        :return: number of rows written
+        :rtype: int
+        """
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        count = 0
+        with path.open("w") as f:
+            writer = DictWriter(f, fieldnames=fieldnames, **kwargs)
+            if header:
+                writer.writeheader()
+            for row in rows:
+                writer.writerow(Serializer.to_dict(row))
+                count += 1
+        return count
+
     @staticmethod
     def to_file(
         obj: Any, path: Optional[Path] = None, valid_exts: Iterable[str] = (".csv", ".json", ".txt")
@@ -3,7 +3,7 @@ from datetime import datetime, timezone
 import jwt
 import pytest
 
-from contxt.auth import TokenProvider
+from contxt.auth import Auth, TokenProvider
 from tests.conftest import WINDOWS
 
 CLAIMS = {"foo": "bar", "aud": "foo_audience", "iss": "foo_issuer"}
@@ -19,6 +19,18 @@ class DummyTokenProvider(TokenProvider):
         return self._access_token
 
 
+class DummyAuth(Auth):
+    def get_token_provider(self, audience: str) -> TokenProvider:
+        return DummyTokenProvider(audience)
+
+
+def user_token_provider(audience: str, sub: str) -> DummyTokenProvider:
+    """A `DummyTokenProvider` for `audience`, with a token (that does not expire) of user `sub`"""
+    token_provider = DummyTokenProvider(audience)
+    token_provider.access_token = jwt.encode({**CLAIMS, "aud": audience, "sub": sub}, "prvkey")
+    return token_provider
+
+
 # FIXME: why is this failing?
 @pytest.mark.skipif(WINDOWS, reason="failing for unknown reason")
 def test_token_provider():
@@ -1,3 +1,180 @@
+import json
 import sys
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from time import sleep
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+from requests import Response
+
+from contxt.services.api import AdapterRegistry, Api
+from contxt.services.circuit_breaker import CircuitBreakerRegistry
 
 WINDOWS = sys.platform.startswith("win")
+
+
+def paged_records(query: Dict[str, str], inserted: int = 0) -> Dict:
+    # Records are ordered by id, after `inserted` records (with negative ids)
+    total = int(query.get("total", 23)) + inserted
+    limit = int(query.get("limit", 1000))
+    if "after" in query:
+        offset = int(query["after"]) + 1 + inserted
+    else:
+        offset = int(query.get("offset", 0))
+    records = [
+        {"id": i - inserted, "label": f"record {i - inserted}"}
+        for i in range(offset, min(offset + limit, total))
+    ]
+    return {"_metadata": {"totalRecords": total, "offset": offset}, "records": records}
+
+
+def paged_fields(query: Dict[str, str], feed_id: int) -> Dict:
+    # A feed has as many fields as its id
+    page = paged_records({**query, "total": str(feed_id)})
+    page["records"] = [
+        {
+            "id": r["id"],
+            "label": r["label"],
+            "output_id": feed_id,
+            "field_descriptor": f"field_{r['id']}",
+            "field_human_name": f"field_{r['id']}",
+            "units": "",
+        }
+        for r in page["records"]
+    ]
+    return page
+
+
+# Time of the first time series point, after which there is one point per second
+SERIES_EPOCH = 1609459200
+
+
+def paged_time_series(query: Dict[str, str], base_url: str) -> Dict:
+    # Points are within `timeStart` and `timeEnd` (inclusive), if given
+    total = int(query.get("total", 23))
+    first = max(int(query.get("timeStart", SERIES_EPOCH)) - SERIES_EPOCH, 0)
+    last = min(int(query.get("timeEnd", SERIES_EPOCH + total)) - SERIES_EPOCH + 1, total)
+    start = max(int(query.get("start", 0)), first)
+    end = min(start + int(query["limit"]), last)
+    records = [
+        {"event_time": f"2021-01-01T00:{i // 60:02d}:{i % 60:02d}.000Z", "value": str(i)}
+        for i in range(start, end)
+    ]
+    next_page_url = f"{base_url}/series?total={total}&start={end}&limit={query['limit']}"
+    next_page_url += "".join(f"&{k}={query[k]}" for k in ("timeStart", "timeEnd") if k in query)
+    return {
+        "records": records,
+        "meta": {
+            "count": len(records),
+            "has_more": end < last,
+            "next_page_url": next_page_url if end < last else None,
+            "next_record_time": end,
+        },
+    }
+
+
+class EchoHandler(BaseHTTPRequestHandler):
+    """Responds with a json echo of the request. Query parameters `status` and
+    `delay` set the response status and delay it (in seconds, also for batched
+    requests), `fail` fails the first such requests with 503, and `etag` sets the
+    response's `ETag` (and responds 304 to a matching `If-None-Match`).
+
+    Paths `/records` and `/series` (or a field's `/data`) instead respond with a
+    page of `total` fake records or time series points, `/feeds/<id>/fields` with
+    a page of the feed's `id` fields, and `/batch` with the responses to a batch
+    of requests, as the Contxt APIs do."""
+
+    attempts: Dict[str, int] = Counter()
+
+    def _route(self, method: str, path: str, body: Optional[str]) -> Tuple[int, Dict]:
+        url = urlsplit(path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        self.attempts[path] += 1
+        sleep(float(query.get("delay", 0)))
+        if self.attempts[path] <= int(query.get("fail", 0)):
+            return 503, {"message": "Service Unavailable"}
+        if url.path.endswith("/records"):
+            # Insert a record before each request after the first, per value of `insert`
+            inserted = 0
+            if "insert" in query:
+                self.attempts[f"insert={query['insert']}"] += 1
+                inserted = self.attempts[f"insert={query['insert']}"] - 1
+            response = paged_records(query, inserted)
+        elif url.path.endswith("/fields") and url.path.split("/")[-3] == "feeds":
+            response = paged_fields(query, int(url.path.split("/")[-2]))
+        elif url.path.endswith(("/series", "/data")):
+            response = paged_time_series(query, f"http://{self.headers['Host']}")
+        elif url.path.endswith("/batch"):
+            response = {
+                label: dict(
+                    zip(("statusCode", "body"), self._route(r["method"], r["uri"], r.get("body")))
+                )
+                for label, r in json.loads(body or "{}").items()
+            }
+            response = {label: {"headers": {}, **r} for label, r in response.items()}
+        else:
+            response = {"method": method, "path": url.path, "query": query, "body": body}
+        return int(query.get("status", 200)), response
+
+    def _respond(self) -> None:
+        query = {k: v[0] for k, v in parse_qs(urlsplit(self.path).query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length).decode() if length else None
+        status, response = self._route(self.command, self.path, body)
+        payload = json.dumps(response).encode()
+        etag = query.get("etag")
+        if etag and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        self.send_response(status)
+        if etag:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _respond
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@pytest.fixture(autouse=True)
+def clear_registries():
+    """Isolate each test from the process-wide circuit breakers and connection pools"""
+    CircuitBreakerRegistry.clear()
+    AdapterRegistry.clear()
+    yield
+
+
+@pytest.fixture(scope="session")
+def echo_server():
+    """Base url of a local server running `EchoHandler`"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), EchoHandler)
+    Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+class EchoApi(Api):
+    """An `Api` that records the requests it sends in `requests`"""
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.requests: List[Tuple[str, str]] = []
+
+    def _send(self, method: str, uri: str, **kwargs) -> Response:
+        self.requests.append((method, uri))
+        return super()._send(method, uri, **kwargs)
+
+
+@pytest.fixture
+def echo_api(echo_server):
+    """An `EchoApi` for `echo_server`"""
+    return EchoApi(echo_server, retry=None)
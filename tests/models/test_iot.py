@@ -0,0 +1,34 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from contxt.models import Parsers
+from contxt.models.iot import FieldValueType, parse_time_series
+from contxt.utils.datetime import datetime_zulu_parse
+
+
+@pytest.mark.parametrize("ts", ["2021-01-02T03:04:05.678Z", "2021-01-02T03:04:05.678000Z"])
+def test_datetime_zulu_parse(ts):
+    expected = datetime(2021, 1, 2, 3, 4, 5, 678000, tzinfo=timezone.utc)
+    assert datetime_zulu_parse(ts) == expected
+
+
+@pytest.mark.parametrize(
+    "raw,expected",
+    [("12", 12), ("-0", 0), ("1.5", 1.5), ("1e3", 1e3), (".5", 0.5), (7, 7), ("007", "007"), ("x", "x")],
+)
+def test_parse_unknown(raw, expected):
+    parsed = Parsers.unknown(raw)
+    assert parsed == expected and type(parsed) is type(expected)
+
+
+def test_parse_time_series():
+    records = [
+        {"event_time": "2021-01-01T00:00:00.000Z", "value": "1"},
+        {"event_time": "2021-01-01T00:01:00.000Z", "value": "true"},
+    ]
+    assert [v for _, v in parse_time_series(records)] == [1, True]
+    assert [v for _, v in parse_time_series(records, FieldValueType.STRING)] == ["1", "true"]
+    assert [v for _, v in parse_time_series(records, FieldValueType.BOOLEAN)] == [True, True]
+    with pytest.raises(ValueError):
+        parse_time_series(records, FieldValueType.NUMERIC)
@@ -1,9 +1,16 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from threading import current_thread
 from time import time
+from typing import List
 
 import pytest
-from requests.exceptions import HTTPError
+from requests.exceptions import ConnectionError, HTTPError
 
-from contxt.services.api import Api, ApiRetry
+from contxt.services.api import Api, ApiCall, ApiRetry
+from contxt.services.instrumentation import RequestEvent, RequestListener, endpoint_template
+from tests.auth.test_base import user_token_provider
+from tests.conftest import EchoApi
 
 
 def test_retries():
@@ -22,3 +29,135 @@ def test_without_retries():
     with pytest.raises(HTTPError) as e:
         api.get("status/500")
     assert e.value.response.status_code == 500
+
+
+def test_shared_pools():
+    api1 = Api("https://example.com/v1")
+    api2 = Api("https://example.com/v2")
+    api3 = Api("https://example.org/v1")
+    api4 = Api("https://example.com/v1", pool_maxsize=64)
+    api5 = Api("https://example.com/v1", share_pool=False)
+    api6 = Api("https://example.com/v1", retry=ApiRetry())
+    api7 = Api("https://example.com/v1", retry=ApiRetry(total=5))
+
+    def adapter(api):
+        return api.session.get_adapter(api.base_url)
+
+    assert adapter(api1) is adapter(api2)
+    assert adapter(api1) is not adapter(api3)
+    assert adapter(api1) is not adapter(api4)
+    assert adapter(api1) is not adapter(api5)
+    assert adapter(api1) is adapter(api6)
+    assert adapter(api1) is not adapter(api7)
+    assert adapter(api4)._pool_maxsize == 64
+
+
+@pytest.mark.parametrize("ordered", [True, False])
+def test_map(echo_server, ordered):
+    api = Api(echo_server, retry=None)
+    calls = [ApiCall("GET", f"items/{i}", params={"delay": 0.05 * (i % 3)}) for i in range(20)]
+    calls.append(ApiCall("POST", "items", json={"id": 20}, parser=lambda r: r["body"]))
+    calls.append(ApiCall("GET", "items/21", params={"status": 404}))
+    t0 = time()
+    results = list(api.map(calls, max_workers=10, ordered=ordered))
+    assert time() - t0 < 0.05 * 20
+    if ordered:
+        assert [r.call for r in results] == calls
+    by_uri = {r.call.uri: r for r in results}
+    assert by_uri["items/3"].value["path"] == "/items/3"
+    assert json.loads(by_uri["items"].result()) == {"id": 20}
+    assert not by_uri["items/21"].ok
+    with pytest.raises(HTTPError):
+        by_uri["items/21"].result()
+
+
+def test_map_workers(echo_server, monkeypatch):
+    pools = []
+
+    class Pool(ThreadPoolExecutor):
+        def __init__(self, max_workers):
+            pools.append(max_workers)
+            super().__init__(max_workers)
+
+    monkeypatch.setattr("contxt.services.api.ThreadPoolExecutor", Pool)
+    api = Api(echo_server, retry=None)
+    calls = [ApiCall("GET", f"items/{i}", parser=lambda _: current_thread().name) for i in range(3)]
+    assert len([r.result() for r in api.map(calls)]) == 3
+    assert list(api.map([])) == []
+    assert pools == [3]
+    assert api.execute(calls[0]) == current_thread().name
+
+
+def test_instrumentation(echo_server):
+    class Recorder(RequestListener):
+        def __init__(self, enabled: bool = True):
+            self.events: List[RequestEvent] = []
+            self._enabled = enabled
+
+        def enabled(self):
+            return self._enabled
+
+        def on_request(self, event):
+            self.events.append(event)
+
+    recorder, disabled = Recorder(), Recorder(enabled=False)
+    api = Api(echo_server, retry=None, listeners=[recorder, disabled])
+    api.post("feeds/42/fields", json={"a": 1}, params={"status": 201})
+    assert not disabled.events
+    (event,) = recorder.events
+    assert (event.method, event.endpoint, event.status) == ("POST", "feeds/{id}/fields", 201)
+    assert event.request_bytes == len(api.codec.dumps({"a": 1}))
+    assert event.response_bytes > 0
+    assert event.retries == 0
+
+
+def test_endpoint_template():
+    assert endpoint_template("feeds/42/fields?limit=10") == "feeds/{id}/fields"
+    assert (
+        endpoint_template("assets/0f8fad5b-d9cb-469f-a165-70867728950e/metrics/values")
+        == "assets/{id}/metrics/values"
+    )
+
+
+def test_retry_policy():
+    retry = ApiRetry(backoff_factor=1, jitter=0.5)
+    assert retry.is_retry("GET", 503)
+    assert retry.is_retry("PUT", 500)
+    assert not retry.is_retry("POST", 500)
+    assert retry.is_retry("POST", 429)
+    assert ApiRetry(retry_non_idempotent=True).is_retry("POST", 500)
+
+    # Backoff is jittered, and settings survive increments
+    retry = retry.increment("GET", "/", error=ConnectionError()).increment(
+        "GET", "/", error=ConnectionError()
+    )
+    assert isinstance(retry, ApiRetry) and retry.jitter == 0.5
+    assert not retry.is_retry("POST", 500)
+    assert 2 <= retry.get_backoff_time() <= 3
+
+
+def test_coalescing(echo_server):
+    api = EchoApi(echo_server, retry=None, coalesce=True)
+    with ThreadPoolExecutor(8) as executor:
+        results = list(executor.map(lambda _: api.get("feeds", params={"delay": 0.2}), range(8)))
+    assert api.requests == [("GET", "feeds")]
+    assert all(result is results[0] for result in results)
+
+    # Different params are not coalesced, and errors are shared
+    with ThreadPoolExecutor(4) as executor:
+        futures = [executor.submit(api.get, "feeds", {"delay": 0.2, "status": 400}) for _ in range(3)]
+        futures.append(executor.submit(api.get, "feeds", {"delay": 0.2}))
+    assert len(api.requests) == 3
+    assert all(isinstance(f.exception(), HTTPError) for f in futures[:3])
+
+
+def test_coalescing_principals(echo_server):
+    # Users of the same client (e.g. of the CLI) do not share requests
+    apis = [
+        EchoApi(echo_server, retry=None, coalesce=True, token_provider=user_token_provider("cli", sub))
+        for sub in ("user-1", "user-2")
+    ]
+    with ThreadPoolExecutor(4) as executor:
+        futures = [executor.submit(api.get, "feeds", {"delay": 0.2}) for api in apis * 2]
+    assert [len(api.requests) for api in apis] == [1, 1]
+    assert futures[0].result() is futures[2].result() is not futures[1].result()
@@ -0,0 +1,70 @@
+import pytest
+from requests.exceptions import HTTPError
+
+from contxt.models.assets import Asset, AssetType
+from contxt.services.api import ApiResultsError
+from contxt.services.assets import AssetsService
+from tests.auth.test_base import DummyAuth
+
+
+def asset_type(label, id=None):
+    return AssetType(label=label, description="", organization_id="org", id=id)
+
+
+@pytest.fixture
+def assets():
+    """An `AssetsService`, without asset types loaded"""
+    return AssetsService(auth=DummyAuth("id", "secret"), organization_id="org", load_types=False)
+
+
+def test_create_asset_types(assets, monkeypatch):
+    def execute(call):
+        label = call.data["label"]
+        if label == "Bad":
+            raise HTTPError("400 Client Error")
+        return asset_type(label, id=f"{label}-id")
+
+    monkeypatch.setattr(assets, "execute", execute)
+    new_asset_types = assets.create_asset_types([asset_type("A"), asset_type("B")])
+    assert [t.id for t in new_asset_types] == ["A-id", "B-id"]
+
+    # The asset types created despite a failure are cached, and passed with the error
+    with pytest.raises(ApiResultsError) as e:
+        assets.create_asset_types([asset_type("C"), asset_type("Bad"), asset_type("D")])
+    assert [t.id for t in e.value.values] == ["C-id", "D-id"]
+    assert [r.ok for r in e.value.results] == [True, False, True]
+    assert isinstance(e.value.__cause__, HTTPError)
+    assert set(assets.types_by_id) == {"A-id", "B-id", "C-id", "D-id"}
+
+
+def test_delete_asset_types(assets, monkeypatch):
+    for label in "ABC":
+        assets._cache_asset_type(asset_type(label, id=f"{label}-id"))
+
+    def execute(call):
+        if call.uri.endswith("B-id"):
+            raise HTTPError("500 Server Error")
+        return {}
+
+    # The asset types deleted despite a failure are uncached
+    monkeypatch.setattr(assets, "execute", execute)
+    with pytest.raises(ApiResultsError):
+        assets.delete_asset_types(list(assets.types_by_id.values()))
+    assert set(assets.types_by_id) == {"B-id"}
+    assert set(assets.types) == {"B"}
+
+
+def test_create_assets(assets, monkeypatch):
+    def execute(call):
+        if call.json["label"] == "Bad":
+            raise HTTPError("400 Client Error")
+        return Asset(id=f"{call.json['label']}-id", **call.json)
+
+    monkeypatch.setattr(assets, "execute", execute)
+    new_assets = [
+        Asset(asset_type_id="type", label=label, description="", organization_id="org")
+        for label in ("A", "Bad", "C")
+    ]
+    with pytest.raises(ApiResultsError) as e:
+        assets.create_assets(new_assets)
+    assert [a.id for a in e.value.values] == ["A-id", "C-id"]
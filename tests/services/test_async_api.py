@@ -0,0 +1,213 @@
+import asyncio
+from threading import current_thread, main_thread
+from time import sleep
+
+import pytest
+
+from contxt.auth import TokenProvider
+from contxt.models.iot import Field, Window
+from contxt.services.api import ApiRetry
+from contxt.services.assets import AsyncAssetsService
+from contxt.services.async_api import AsyncApi, AsyncConfiguredApi
+from contxt.services.circuit_breaker import CircuitBreaker
+from contxt.services.iot import AsyncIotService
+from contxt.services.pagination import AsyncPagedRecords, AsyncPagedTimeSeries, PageOptions
+from tests.auth.test_base import DummyAuth, DummyTokenProvider
+
+web = pytest.importorskip("aiohttp.web")
+test_utils = pytest.importorskip("aiohttp.test_utils")
+
+RECORDS = [{"id": i} for i in range(23)]
+ASSETS = [
+    {
+        "id": f"asset-{i}",
+        "asset_type_id": "type",
+        "label": f"Asset {i}",
+        "description": "",
+        "organization_id": "org",
+        "parent_id": None,
+        "hierarchy_level": 1,
+        "created_at": "2021-01-01T00:00:00.000Z",
+        "updated_at": "2021-01-01T00:00:00.000Z",
+    }
+    for i in range(7)
+]
+
+
+def make_app():
+    calls = {"flaky": 0}
+
+    async def records(request):
+        offset, limit = int(request.query["offset"]), int(request.query["limit"])
+        return web.json_response(
+            {"_metadata": {"totalRecords": len(RECORDS)}, "records": RECORDS[offset : offset + limit]}
+        )
+
+    async def flaky(request):
+        calls["flaky"] += 1
+        if calls["flaky"] < 3:
+            return web.json_response({"message": "try again"}, status=502)
+        return web.json_response({"calls": calls["flaky"]})
+
+    async def assets(request):
+        assert request.headers["Authorization"].startswith("Bearer ")
+        offset, limit = int(request.query["offset"]), int(request.query["limit"])
+        return web.json_response(
+            {"_metadata": {"totalRecords": len(ASSETS)}, "records": ASSETS[offset : offset + limit]}
+        )
+
+    async def slow(request):
+        await asyncio.sleep(1)
+        return web.json_response({})
+
+    async def asset(request):
+        return web.json_response(next(a for a in ASSETS if a["id"] == request.match_info["id"]))
+
+    async def field_data(request):
+        # Points of each field are its output id, for its first 12 seconds
+        output_id, total = int(request.match_info["output_id"]), 12
+        start, limit = int(request.query.get("start", 0)), int(request.query["limit"])
+        end = min(start + limit, total)
+        next_page_url = request.url.with_query({"start": end, "limit": limit})
+        return web.json_response(
+            {
+                "records": [
+                    {"event_time": f"2021-01-01T00:00:{i:02d}.000Z", "value": str(output_id)}
+                    for i in range(start, end)
+                ],
+                "meta": {
+                    "count": end - start,
+                    "has_more": end < total,
+                    "next_page_url": str(next_page_url) if end < total else None,
+                    "next_record_time": end,
+                },
+            }
+        )
+
+    app = web.Application()
+    app.router.add_get("/records", records)
+    app.router.add_get("/flaky", flaky)
+    app.router.add_get("/slow", slow)
+    app.router.add_get("/organizations/{org}/assets", assets)
+    app.router.add_get("/assets/{id}", asset)
+    app.router.add_get("/outputs/{output_id}/fields/{field}/data", field_data)
+    return app
+
+
+def run(coro_fn, cls=None, **kwargs):
+    """Run `coro_fn` with an `AsyncApi` (or configured api `cls`) of a test server"""
+
+    async def main():
+        async with test_utils.TestServer(make_app()) as server:
+            url = str(server.make_url("/"))
+            if cls is None:
+                api = AsyncApi(url, retry=ApiRetry(backoff_factor=0))
+            else:
+                api = cls(auth=DummyAuth("id", "secret"), **kwargs)
+                api.base_url = url
+            async with api:
+                return await coro_fn(api)
+
+    return asyncio.run(main())
+
+
+def test_paged_records():
+    async def collect(api):
+        pages = AsyncPagedRecords(api, "records", options=PageOptions(per_page=5), concurrency=2)
+        return [r async for r in pages]
+
+    assert run(collect) == RECORDS
+
+
+def test_retries():
+    async def get(api):
+        return await api.get("flaky")
+
+    assert run(get) == {"calls": 3}
+
+
+def test_circuit_breaker_trial_cancelled():
+    async def get(api):
+        api.circuit_breaker = CircuitBreaker(api.base_url, failure_threshold=1, reset_timeout=0)
+        api.circuit_breaker.record_failure()
+        # A timed out (i.e. cancelled) trial request must not hold the half-open circuit
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(api.get("slow"), 0.05)
+        return await api.get("flaky")
+
+    assert run(get) == {"calls": 3}
+
+
+def test_token_provider_off_loop():
+    threads = set()
+
+    class BlockingTokenProvider(DummyTokenProvider):
+        @TokenProvider.access_token.getter  # type: ignore
+        def access_token(self):
+            # Blocks, as when refreshing the token
+            threads.add(current_thread())
+            sleep(0.05)
+            return "token"
+
+    async def get(api):
+        api.token_provider = BlockingTokenProvider("audience")
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticker = asyncio.ensure_future(tick())
+        params = {"offset": 0, "limit": 1}
+        await asyncio.gather(*(api.get("records", params=params) for _ in range(3)))
+        ticker.cancel()
+        return ticks
+
+    # The event loop keeps running while tokens are fetched, on another thread
+    assert run(get) >= 5
+    assert threads and main_thread() not in threads
+
+
+def test_paged_time_series_read_ahead(echo_server):
+    async def collect():
+        async with AsyncApi(echo_server, retry=None) as api:
+            series = AsyncPagedTimeSeries(api, "series", params={"total": 23}, per_page=5, read_ahead=2)
+            return [v async for _, v in series]
+
+    assert asyncio.run(collect()) == list(range(23))
+
+
+def test_configured_api():
+    with pytest.raises(KeyError):
+        AsyncIotService(auth=DummyAuth("id", "secret"), env="nowhere")
+    api = AsyncIotService(auth=DummyAuth("id", "secret"), env="staging")
+    assert isinstance(api, AsyncConfiguredApi)
+    assert (api.env, api.client_id) == ("staging", AsyncIotService._get_env("staging").client_id)
+
+
+def test_assets_service():
+    async def get(api):
+        assets = [a async for a in api.get_assets_for_organization(page_options=PageOptions(per_page=3))]
+        return assets, await api.get_asset("asset-2")
+
+    assets, asset = run(get, AsyncAssetsService, organization_id="org")
+    assert [a.id for a in assets] == [a["id"] for a in ASSETS]
+    assert asset.label == "Asset 2"
+
+
+def test_iot_service():
+    fields = [
+        Field(
+            label=f"Field {i}", field_descriptor="", units="", output_id=i, field_human_name=f"field_{i}"
+        )
+        for i in range(4)
+    ]
+
+    async def get(api):
+        return await api.get_time_series_for_fields(fields, window=Window.RAW, per_page=5, concurrency=2)
+
+    for series in run(get, AsyncIotService):
+        assert len(series.time_series) == 12
+        assert set(series.time_series.values()) == {series.field.output_id}
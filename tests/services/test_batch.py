@@ -0,0 +1,89 @@
+from threading import Lock
+from time import sleep
+
+import pytest
+from requests.exceptions import HTTPError
+
+from contxt.services.batch import Batcher, BatchError
+
+
+def test_batcher(echo_api):
+    batcher = Batcher(echo_api, max_requests=4)
+    bodies = batcher.get({str(i): (f"feeds/{i}", {"a": i}) for i in range(10)})
+    assert echo_api.requests == [("POST", "batch")] * 3
+    assert [body["path"] for body in bodies.values()] == [f"/feeds/{i}" for i in range(10)]
+    assert bodies["3"]["query"] == {"a": "3"}
+
+
+def test_batcher_retries(echo_api):
+    batcher = Batcher(echo_api, max_attempts=2)
+    bodies = batcher.get({"flaky": ("feeds/flaky", {"fail": 1}), "ok": ("feeds/ok", None)})
+    assert set(bodies) == {"flaky", "ok"}
+    assert len(echo_api.requests) == 2
+
+    # Client errors are not retried, and raise
+    with pytest.raises(BatchError) as e:
+        batcher.get({"bad": ("feeds/bad", {"status": 404}), "flaky": ("feeds/flakier", {"fail": 2})})
+    assert set(e.value.responses) == {"bad", "flaky"}
+    assert len(echo_api.requests) == 4
+
+
+def test_batcher_retries_batch(echo_api):
+    # The batch request itself fails with 503, and is not retried by the api
+    batcher = Batcher(echo_api, uri="batch?fail=1", backoff_factor=0)
+    assert batcher.get({"ok": ("feeds/ok", None)})["ok"]["path"] == "/feeds/ok"
+    assert echo_api.requests == [("POST", "batch?fail=1")] * 2
+
+    # Unless it batches requests that are not idempotent
+    batcher = Batcher(echo_api, uri="batch?fail=2", backoff_factor=0)
+    with pytest.raises(HTTPError):
+        batcher.send({"new": batcher.request("POST", "feeds", data="{}")})
+    assert len(echo_api.requests) == 3
+
+
+def test_batcher_pages(echo_api, echo_server):
+    batcher = Batcher(echo_api, max_requests=2)
+
+    def parse(label, body):
+        next_page_url = body["meta"]["next_page_url"]
+        next_request = batcher.request("GET", next_page_url) if next_page_url else None
+        return [int(r["value"]) for r in body["records"]], next_request
+
+    requests = {
+        str(i): batcher.request("GET", "series", {"total": 10 + i, "limit": 3}) for i in range(5)
+    }
+    series = {label: [] for label in requests}
+    completed = []
+    for label, values, done in batcher.pages(requests, parse, max_in_flight=3):
+        assert label not in completed
+        series[label].extend(values)
+        if done:
+            completed.append(label)
+    assert sorted(completed) == sorted(requests)
+    assert series == {str(i): list(range(10 + i)) for i in range(5)}
+
+    with pytest.raises(BatchError):
+        list(batcher.pages({"bad": batcher.request("GET", "feeds", {"status": 404})}, parse))
+
+
+def test_batcher_pages_concurrency(echo_api):
+    batcher = Batcher(echo_api)
+    post = batcher._post
+    lock = Lock()
+    in_flight, sizes = [0], []
+
+    def slow_post(requests):
+        with lock:
+            in_flight[0] += 1
+            sizes.append((len(requests), in_flight[0]))
+        sleep(0.05)
+        with lock:
+            in_flight[0] -= 1
+        return post(requests)
+
+    # Fewer requests than fit in one batch are still spread over concurrent batches
+    batcher._post = slow_post
+    requests = {str(i): batcher.request("GET", "series", {"total": 3, "limit": 3}) for i in range(10)}
+    list(batcher.pages(requests, lambda label, body: (body, None), max_in_flight=4))
+    assert sorted(size for size, _ in sizes) == [2, 2, 3, 3]
+    assert max(n for _, n in sizes) > 1
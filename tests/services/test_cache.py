@@ -0,0 +1,91 @@
+from concurrent.futures import ThreadPoolExecutor
+from time import sleep
+
+from contxt.services.cache import ResponseCache
+from tests.auth.test_base import DummyTokenProvider, user_token_provider
+from tests.conftest import EchoApi
+
+
+def test_response_cache(echo_server):
+    api = EchoApi(echo_server, retry=None, cache=ResponseCache(max_entries=2, ttls={"feeds/{id}": 0.05}))
+    assert api.get("feeds", params={"a": 1}) == api.get("feeds", params={"a": 1})
+    api.get("feeds", params={"a": 2})
+    assert api.requests == [("GET", "feeds"), ("GET", "feeds")]
+
+    # Evicts the least recently used entry
+    api.get("feeds/1")
+    api.get("feeds", params={"a": 1})
+    assert len(api.cache) == 2 and len(api.requests) == 4
+
+    # Stale entries are refetched
+    sleep(0.05)
+    api.get("feeds/1")
+    assert len(api.requests) == 5
+
+    # Mutations invalidate the resource, and its collection
+    api.get("feeds", params={"a": 2})
+    api.put("feeds/1", json={})
+    api.get("feeds/1")
+    api.get("feeds", params={"a": 2})
+    assert len(api.requests) == 9
+
+
+def test_response_cache_revalidation(echo_server):
+    api = EchoApi(echo_server, retry=None, cache=ResponseCache(ttl=0))
+    value = api.get("feeds", params={"etag": '"v1"'})
+    assert api.get("feeds", params={"etag": '"v1"'}) is value
+    assert len(api.requests) == 2
+
+
+def test_response_cache_on_disk(echo_server, tmp_path):
+    cache = ResponseCache(path=tmp_path / "cache")
+    EchoApi(echo_server, retry=None, cache=cache).get("feeds")
+    cache.close()
+
+    api = EchoApi(echo_server, retry=None, cache=ResponseCache(path=tmp_path / "cache"))
+    assert api.get("feeds")["path"] == "/feeds"
+    assert api.requests == []
+
+
+def test_response_cache_shared(echo_server):
+    cache = ResponseCache()
+    apis = [
+        EchoApi(echo_server, retry=None, cache=cache, token_provider=DummyTokenProvider("a")),
+        EchoApi(echo_server, retry=None, cache=cache, token_provider=DummyTokenProvider("b")),
+        EchoApi(f"{echo_server}/v2", retry=None, cache=cache),
+    ]
+    for api in apis:
+        assert api.get("feeds") is api.get("feeds")
+    assert [len(api.requests) for api in apis] == [1, 1, 1]
+
+    # A mutation invalidates the entries of every principal
+    apis[0].put("feeds", json={})
+    apis[1].get("feeds")
+    apis[2].get("feeds")
+    assert [len(api.requests) for api in apis] == [2, 2, 1]
+
+
+def test_response_cache_principals(echo_server):
+    # Users of the same client (e.g. of the CLI) do not share responses
+    cache = ResponseCache()
+    apis = [
+        EchoApi(echo_server, retry=None, cache=cache, token_provider=user_token_provider("cli", sub))
+        for sub in ("user-1", "user-2")
+    ]
+    for api in apis:
+        assert api.get("feeds") is api.get("feeds")
+    assert [len(api.requests) for api in apis] == [1, 1]
+    assert len(cache) == 2
+
+
+def test_response_cache_invalidated_after_mutation(echo_server):
+    api = EchoApi(echo_server, retry=None, cache=ResponseCache())
+    with ThreadPoolExecutor() as executor:
+        put = executor.submit(api.put, "feeds/1", params={"delay": 0.1}, json={})
+        sleep(0.05)
+        # Cached while the mutation is in flight ...
+        api.get("feeds/1")
+        put.result()
+    # ... but not after it
+    api.get("feeds/1")
+    assert api.requests == [("PUT", "feeds/1"), ("GET", "feeds/1"), ("GET", "feeds/1")]
@@ -0,0 +1,67 @@
+from time import sleep
+
+import pytest
+from requests.exceptions import HTTPError
+
+from contxt.services.api import Api
+from contxt.services.circuit_breaker import CircuitBreaker, CircuitBreakerRegistry, CircuitOpenError
+
+
+def test_circuit_breaker():
+    breaker = CircuitBreaker("example.com", failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    breaker.before_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+    # Half-open lets a single trial request through
+    sleep(0.05)
+    breaker.before_request()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+    breaker.record_status(200)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_circuit_breaker_registry():
+    # Breakers are shared by host and settings
+    breaker = CircuitBreakerRegistry.get("example.com")
+    assert CircuitBreakerRegistry.get("example.com") is breaker
+    other = CircuitBreakerRegistry.get("example.com", failure_threshold=1)
+    assert other is not breaker and other.failure_threshold == 1
+    assert Api("https://example.com").circuit_breaker is breaker
+    assert Api("https://example.com", circuit_breaker=other).circuit_breaker is other
+    assert Api("https://example.com", circuit_breaker=False).circuit_breaker is None
+
+
+def test_api_fails_fast(echo_server):
+    api = Api(echo_server, retry=None, circuit_breaker=CircuitBreaker(echo_server, failure_threshold=2))
+    for _ in range(2):
+        with pytest.raises(HTTPError):
+            api.get("status", params={"status": 503})
+    with pytest.raises(CircuitOpenError):
+        api.get("status")
+
+
+def test_trial_ends_on_any_error(echo_server):
+    breaker = CircuitBreaker(echo_server, failure_threshold=1, reset_timeout=0.05)
+    api = Api(echo_server, retry=None, circuit_breaker=breaker)
+    breaker.record_failure()
+    sleep(0.05)
+
+    def failing_auth(request):
+        raise RuntimeError("no token")
+
+    # The trial fails without a response (e.g. in the token provider)
+    api.session.auth = failing_auth
+    with pytest.raises(RuntimeError):
+        api.get("status")
+    assert breaker.state == CircuitBreaker.OPEN
+
+    # ... so a later trial is still let through
+    api.session.auth = None
+    sleep(0.05)
+    api.get("status")
+    assert breaker.state == CircuitBreaker.CLOSED
@@ -0,0 +1,57 @@
+from datetime import datetime
+
+import pytest
+from requests.exceptions import HTTPError
+
+from contxt.models.events import Event, EventDefinition
+from contxt.services.api import ApiResultsError
+from contxt.services.events import EventsService
+from tests.auth.test_base import DummyAuth
+
+
+@pytest.fixture
+def events(monkeypatch):
+    """An `EventsService` of events named after their ids (except "missing")"""
+    events = EventsService(auth=DummyAuth("id", "secret"))
+
+    def execute(call):
+        id = call.uri.split("/")[-1]
+        if id == "missing":
+            raise HTTPError("404 Client Error")
+        return Event(
+            id=id,
+            name=f"Event {id}",
+            event_type_id="type",
+            organization_id="org",
+            allow_others_to_trigger=False,
+            is_public=False,
+        )
+
+    monkeypatch.setattr(events, "execute", execute)
+    return events
+
+
+def test_get_events(events):
+    assert {id: e.name for id, e in events.get_events(["a", "b"]).items()} == {
+        "a": "Event a",
+        "b": "Event b",
+    }
+    with pytest.raises(ApiResultsError) as e:
+        events.get_events(["a", "missing", "b"])
+    assert [e.name for e in e.value.values] == ["Event a", "Event b"]
+
+
+def test_set_human_readable_parameters(events):
+    chain = [{"event_id": id, "overlap_variance": 120} for id in ("a", "b", "c")]
+    definition = EventDefinition(
+        event_id="d",
+        description="",
+        parameters={"$chain": chain},
+        created_at=datetime.now(),
+        updated_at=datetime.now(),
+    )
+    events.set_human_readable_parameters(definition)
+    assert definition.human_readable_parameters == (
+        "Event Event a overlaps with Event b within 2.0 min "
+        "Event Event b overlaps with Event c within 2.0 min "
+    )
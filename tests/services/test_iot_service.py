@@ -0,0 +1,175 @@
+from datetime import datetime, timezone
+from typing import List, Set, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from contxt.models.iot import Feed, Field, FieldValueType
+from contxt.services.batch import BatchError
+from contxt.services.instrumentation import RequestEvent, RequestListener
+from contxt.services.iot import IotService
+from contxt.services.series_cache import TimeSeriesCache
+from tests.auth.test_base import DummyAuth
+from tests.conftest import SERIES_EPOCH
+
+
+class EventListener(RequestListener):
+    """Records the events of the requests sent"""
+
+    def __init__(self) -> None:
+        self.events: List[RequestEvent] = []
+
+    def on_request(self, event: RequestEvent) -> None:
+        self.events.append(event)
+
+    def time_ranges(self) -> Set[Tuple[int, int]]:
+        """The time ranges of the time series requests sent"""
+        return {time_range(event.url) for event in self.events}
+
+
+def time_range(url):
+    query = {
+        k: int(v[0]) - SERIES_EPOCH for k, v in parse_qs(urlsplit(url).query).items() if k[:4] == "time"
+    }
+    return query["timeStart"], query["timeEnd"]
+
+
+def at(i):
+    return datetime.fromtimestamp(SERIES_EPOCH + i, timezone.utc)
+
+
+def points(start, end, parse=int):
+    """The echo server's points from `start` through `end`"""
+    return [(at(i), parse(i)) for i in range(start, end + 1)]
+
+
+def field(output_id=1, name="field"):
+    return Field(
+        label=name,
+        field_descriptor="",
+        units="",
+        output_id=output_id,
+        field_human_name=name,
+        value_type=FieldValueType.STRING,
+    )
+
+
+@pytest.fixture
+def iot(echo_server):
+    """An `IotService` of `echo_server`, with a `TimeSeriesCache`"""
+    iot = IotService(auth=DummyAuth("id", "secret"), series_cache=TimeSeriesCache())
+    iot.base_url = f"{echo_server}/"
+    return iot
+
+
+def test_time_series_for_field_cached(iot):
+    listener = EventListener()
+    iot.add_listener(listener)
+
+    def get(start, end, **kwargs):
+        listener.events.clear()
+        return list(
+            iot.get_time_series_for_field(field(), at(start), end_time=at(end), per_page=4, **kwargs)
+        )
+
+    # The end time is included, as without the cache
+    assert get(5, 10) == points(5, 10)
+    assert get(14, 15) == points(14, 15)
+    assert get(0, 20) == points(0, 20)
+    assert listener.time_ranges() == {(0, 4), (11, 13), (16, 20)}
+    cache, iot.series_cache = iot.series_cache, None
+    assert get(0, 20) == points(0, 20)
+    iot.series_cache = cache
+
+    # A fully cached range is not fetched
+    assert get(2, 18, stream=True) == points(2, 18)
+    assert listener.time_ranges() == set()
+
+    # Nor are values parsed as another type
+    assert get(2, 18, typed=True) == points(2, 18, parse=str)
+    assert listener.time_ranges() == {(2, 18)}
+
+
+def test_time_series_for_fields_cached(iot):
+    ranges = set()
+    send = iot.batcher.send
+
+    def record(requests):
+        ranges.update(time_range(req.uri) for req in requests.values())
+        return send(requests)
+
+    iot.batcher.send = record
+    a, b, c = field(1, "a"), field(2, "b"), field(3, "c")
+    iot.get_time_series_for_field(a, at(5), end_time=at(10))
+    iot.get_time_series_for_field(a, at(14), end_time=at(15))
+    iot.get_time_series_for_field(b, at(0), end_time=at(20))
+
+    # Only the gaps of partially cached fields are fetched, and merged with the cached points
+    series = iot.get_time_series_for_fields([a, b, c], at(0), end_time=at(20), per_page=4)
+    assert series[0].field == b and {s.field.output_id for s in series} == {1, 2, 3}
+    assert all(list(s.time_series.items()) == points(0, 20) for s in series)
+    assert ranges == {(0, 4), (11, 13), (16, 20), (0, 20)}
+
+    # Fully cached fields are not fetched again
+    ranges.clear()
+    series = iot.get_time_series_for_fields([a, b, c], at(1), end_time=at(19), per_page=4)
+    assert all(list(s.time_series.items()) == points(1, 19) for s in series)
+    assert ranges == set()
+
+
+def test_get_feeds_with_ids(iot, monkeypatch):
+    iot.batcher.max_requests = 2
+    monkeypatch.setattr(Feed, "from_api", staticmethod(lambda body: body["path"]))
+    assert iot.get_feeds_with_ids(iter([3, 1, 2])) == {3: "/feeds/3", 1: "/feeds/1", 2: "/feeds/2"}
+
+
+def test_get_fields_for_feeds(iot):
+    sends = []
+    send = iot.batcher.send
+
+    def record(requests):
+        sends.append(sorted(requests))
+        return send(requests)
+
+    iot.batcher.send = record
+    iot.batcher.max_requests = 3
+    listener = EventListener()
+    iot.add_listener(listener)
+    # Feeds have as many fields as their id, fetched 2 at a time until all (or none) are
+    fields = iot.get_fields_for_feeds([0, 1, 3, 7], per_page=2)
+    assert {id: [f.id for f in fs] for id, fs in fields.items()} == {
+        0: [],
+        1: [0],
+        3: [0, 1, 2],
+        7: list(range(7)),
+    }
+    assert all(f.output_id == 7 for f in fields[7])
+    assert sends == [["0", "1", "3", "7"], ["3", "7"], ["7"], ["7"]]
+    assert [(e.method, e.endpoint) for e in listener.events] == [("POST", "batch")] * 5
+
+
+def test_iter_time_series_for_fields(iot, monkeypatch):
+    iot.series_cache = None
+    request = iot.batcher.request
+
+    def request_with(method, uri, params=None, **kwargs):
+        # Fail the first (or every) request of field "flaky" (or "broken"), after a while
+        name = uri.split("/")[-2]
+        params = {**(params or {}), **FAILURES.get(name, {})}
+        return request(method, uri, params, **kwargs)
+
+    FAILURES = {"flaky": {"fail": 1}, "broken": {"status": 503, "delay": 0.1}}
+    monkeypatch.setattr(iot.batcher, "request", request_with)
+    fields = [field(i, name) for i, name in enumerate(("a", "flaky", "b"))]
+    series = list(iot.iter_time_series_for_fields(fields, at(0), end_time=at(9), per_page=4))
+    assert sorted(s.field.field_human_name for s in series) == ["a", "b", "flaky"]
+    assert all(list(s.time_series.items()) == points(0, 9) for s in series)
+
+    # A request that keeps failing raises, once retried, after the fields already done
+    fields = [field(i, name) for i, name in enumerate(("a", "broken", "b"))]
+    done = []
+    with pytest.raises(BatchError) as e:
+        for s in iot.iter_time_series_for_fields(fields, at(0), end_time=at(9), per_page=4):
+            done.append(s.field.field_human_name)
+    assert sorted(done) == ["a", "b"]
+    assert set(e.value.responses) == {"broken"}
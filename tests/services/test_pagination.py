@@ -0,0 +1,297 @@
+import gzip
+import io
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from contxt.services.pagination import (
+    AdaptivePageSize,
+    PagedRecords,
+    PagedTimeSeries,
+    PageOptions,
+    ShardedTimeSeries,
+    load_cursor,
+)
+
+TOTAL = 23
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_paged_records(echo_api, stream):
+    records = PagedRecords(
+        api=echo_api,
+        url="records",
+        params={"total": TOTAL},
+        options=PageOptions(per_page=5, stream=stream),
+        record_parser=lambda r: r["id"],
+    )
+    assert list(records) == list(range(TOTAL))
+    assert len(records) == TOTAL
+    assert records[7] == 7
+    assert records[20:] == [20, 21, 22]
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_paged_time_series(echo_api, stream):
+    series = PagedTimeSeries(
+        api=echo_api, url="series", params={"total": TOTAL}, per_page=5, stream=stream
+    )
+    points = list(series)
+    assert [v for _, v in points] == list(range(TOTAL))
+    assert points[0][0].isoformat() == "2021-01-01T00:00:00+00:00"
+    assert len(echo_api.requests) == 5
+
+
+def test_paged_records_prefetch(echo_api):
+    records = PagedRecords(
+        api=echo_api,
+        url="records",
+        params={"total": TOTAL},
+        options=PageOptions(per_page=2, prefetch=3),
+        record_parser=lambda r: r["id"],
+    )
+    assert list(records) == list(range(TOTAL))
+    assert len(echo_api.requests) == 12
+
+
+def test_paged_records_slicing(echo_api):
+    records = PagedRecords(
+        api=echo_api,
+        url="records",
+        params={"total": TOTAL},
+        options=PageOptions(per_page=5),
+        record_parser=lambda r: r["id"],
+    )
+    expected = list(range(TOTAL))
+    assert records[:3] == expected[:3]
+    assert records[-1] == expected[-1]
+    assert len(echo_api.requests) == 2
+    for index in (slice(-7, None), slice(3, 18, 4), slice(None, None, -6), slice(30, 40)):
+        assert records[index] == expected[index]
+
+
+def test_paged_records_cache(echo_api):
+    records = PagedRecords(
+        api=echo_api,
+        url="records",
+        params={"total": TOTAL},
+        options=PageOptions(per_page=5, cache_pages=2),
+        record_parser=lambda r: r["id"],
+    )
+    for _ in range(3):
+        assert (records[0], records[12]) == (0, 12)
+    assert len(echo_api.requests) == 2
+    assert (records.cache.hits, records.cache.misses) == (4, 1)
+
+    # Evicts the least recently used pages
+    assert list(records) == list(range(TOTAL))
+    assert len(records.cache) == 2 and 0 not in records.cache
+    assert len(echo_api.requests) == 6
+
+    records.options.cache_bytes = records.cache.max_bytes = 1
+    records.cache.put(0, records.get_page(1), size=2)
+    assert len(records.cache) == 1
+
+
+def test_paged_records_cache_bytes(echo_api):
+    options = PageOptions(per_page=5, cache_bytes=10 ** 6)
+    records = PagedRecords(api=echo_api, url="records", params={"total": TOTAL}, options=options)
+    records.get_page(0)
+    records[5:15]
+
+    # Pages are sized by their response bodies
+    sizes = [echo_api.get_sized("records", params=records._page_params(i))[1] for i in range(3)]
+    assert [records.cache._pages[i][1] for i in range(3)] == sizes
+    assert records.cache.size == sum(sizes)
+
+
+def test_paged_time_series_read_ahead(echo_api):
+    series = PagedTimeSeries(
+        api=echo_api, url="series", params={"total": TOTAL}, per_page=5, read_ahead=2
+    )
+    assert [v for _, v in series] == list(range(TOTAL))
+    assert len(echo_api.requests) == 5
+
+    # Stops reading ahead when abandoned
+    points = iter(series)
+    next(points)
+    points.close()
+    assert series.page_index == 0
+
+
+@pytest.mark.parametrize("options", [{}, {"stream": True}, {"prefetch": 2}])
+def test_paged_records_cursor(echo_api, tmp_path, options):
+    path = tmp_path / "cursor.json"
+    records = PagedRecords(
+        api=echo_api,
+        url="records",
+        params={"total": TOTAL},
+        options=PageOptions(per_page=5, **options),
+        record_parser=lambda r: r["id"],
+        autosave=path,
+    )
+    points = iter(records)
+    assert [next(points) for _ in range(12)] == list(range(12))
+    assert load_cursor(path)["position"] == 10
+
+    # Continue from the cursor, or from the last saved one
+    resumed = PagedRecords.from_cursor(echo_api, records.cursor, record_parser=lambda r: r["id"])
+    assert list(resumed) == list(range(12, TOTAL))
+    resumed = PagedRecords.from_cursor(echo_api, load_cursor(path), record_parser=lambda r: r["id"])
+    assert list(resumed) == list(range(10, TOTAL))
+
+
+@pytest.mark.parametrize("options", [{}, {"stream": True}, {"read_ahead": 2}])
+def test_paged_time_series_cursor(echo_api, tmp_path, options):
+    path = tmp_path / "cursor.json"
+    series = PagedTimeSeries(
+        api=echo_api, url="series", params={"total": TOTAL}, per_page=5, autosave=path, **options
+    )
+    points = iter(series)
+    assert [next(points)[1] for _ in range(7)] == list(range(7))
+    assert load_cursor(path)["next_record_time"] == 5
+
+    resumed = PagedTimeSeries.from_cursor(echo_api, series.cursor)
+    assert [v for _, v in resumed] == list(range(7, TOTAL))
+    resumed = PagedTimeSeries.from_cursor(echo_api, load_cursor(path))
+    assert [v for _, v in resumed] == list(range(5, TOTAL))
+    assert [v for _, v in resumed] == list(range(5, TOTAL))
+    assert list(PagedTimeSeries.from_cursor(echo_api, resumed.cursor)) == []
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_paged_records_lazy_parsing(echo_api, stream):
+    parsed = []
+
+    def parse(record):
+        parsed.append(record["id"])
+        return record["id"]
+
+    records = PagedRecords(
+        api=echo_api,
+        url="records",
+        params={"total": TOTAL},
+        options=PageOptions(per_page=5, stream=stream),
+        record_parser=parse,
+    )
+    assert len(records) == TOTAL
+    assert next(r["id"] for r in records.iter_raw() if r["label"] == "record 7") == 7
+    assert parsed == []
+    assert next(r for r in records if r == 2) == 2
+    assert parsed == [0, 1, 2]
+
+
+def test_paged_records_lazy_fetch(echo_api):
+    records = PagedRecords(api=echo_api, url="records", params={"total": TOTAL})
+    series = PagedTimeSeries(api=echo_api, url="series", params={"total": TOTAL})
+    assert echo_api.requests == []
+    assert records.count() == records.count() == TOTAL
+    assert len(echo_api.requests) == 1
+    assert len(list(series)) == TOTAL
+
+
+def test_adaptive_page_size(echo_api):
+    adaptive = AdaptivePageSize(min_per_page=2, max_per_page=8, target_seconds=1, max_bytes=1000)
+    assert adaptive.next_size(4, elapsed=0.1) == 8
+    assert adaptive.next_size(4, elapsed=4) == 2
+    assert adaptive.next_size(4, elapsed=0.1, nbytes=1000) == 4
+
+    # Fast pages grow up to the maximum
+    records = PagedRecords(
+        api=echo_api,
+        url="records",
+        params={"total": TOTAL},
+        options=PageOptions(per_page=2, adaptive=adaptive),
+        record_parser=lambda r: r["id"],
+    )
+    assert [r for r in records] == list(range(TOTAL))
+    assert len(echo_api.requests) == 5
+    series = PagedTimeSeries(
+        api=echo_api, url="series", params={"total": TOTAL}, per_page=2, adaptive=adaptive
+    )
+    assert [v for _, v in series] == list(range(TOTAL))
+    assert echo_api.requests[-1] == ("GET", "series?total=23&start=22&limit=8")
+
+
+def test_adaptive_page_size_bytes(echo_api):
+    get_sized = echo_api.get_sized
+    limits = []
+
+    def get_sized_limit(uri, params):
+        limits.append(params["limit"])
+        return get_sized(uri, params=params)
+
+    # Pages shrink to fit their response bodies within `max_bytes`
+    _, nbytes = get_sized("records", params={"total": TOTAL, "offset": 0, "limit": 8})
+    adaptive = AdaptivePageSize(min_per_page=2, max_per_page=8, max_bytes=nbytes // 2)
+    echo_api.get_sized = get_sized_limit
+    records = PagedRecords(
+        api=echo_api,
+        url="records",
+        params={"total": TOTAL},
+        options=PageOptions(per_page=8, adaptive=adaptive),
+    )
+    assert len(list(records)) == TOTAL
+    assert limits[:2] == [8, int(8 * adaptive.max_bytes / nbytes)]
+
+
+@pytest.mark.parametrize("keyset", [False, True])
+def test_paged_records_drift(echo_api, keyset):
+    records = PagedRecords(
+        api=echo_api,
+        url="records",
+        params={"total": TOTAL, "insert": f"drift-{keyset}"},
+        options=PageOptions(per_page=5, order_by="id", keyset=keyset, dedupe_key="id"),
+        record_parser=lambda r: r["id"],
+    )
+    ids = [r for r in records]
+    assert records.drift == 4
+    if keyset:
+        # Pages continue after the last key, so inserted records do not shift them
+        assert ids == list(range(TOTAL))
+        assert records.cursor["last_key"] == TOTAL - 1
+    else:
+        assert ids == list(range(TOTAL - 2))
+        assert records.duplicates == 4
+
+
+@pytest.mark.parametrize("name", ["records.jsonl", "records.jsonl.gz"])
+def test_paged_records_export(echo_api, tmp_path, name):
+    records = PagedRecords(
+        api=echo_api, url="records", params={"total": TOTAL}, options=PageOptions(per_page=5)
+    )
+    assert records.export(tmp_path / name, prefetch=2) == TOTAL
+    open_ = gzip.open if name.endswith(".gz") else open
+    with open_(tmp_path / name, "rt") as f:
+        assert [json.loads(line)["id"] for line in f] == list(range(TOTAL))
+
+    buffer = io.BytesIO()
+    records.export(buffer)
+    assert buffer.getvalue().count(b"\n") == TOTAL
+    with pytest.raises(ValueError):
+        records.export(buffer, format="csv")
+
+
+@pytest.mark.parametrize("total", [3, 200])
+def test_sharded_time_series(echo_api, total):
+    def at(i):
+        return datetime.fromtimestamp(1609459200 + i, timezone.utc)
+
+    series = ShardedTimeSeries(
+        api=echo_api,
+        url="series",
+        start_time=at(0),
+        end_time=at(150),
+        params={"total": total},
+        per_page=5,
+        pages_per_shard=2,
+        max_workers=3,
+    )
+    points = list(series)
+    assert [v for _, v in points] == list(range(min(total, 151)))
+    assert [t for t, _ in points] == [at(i) for i in range(len(points))]
+    if total > 5:
+        # Shards of about 2 pages each, from the first page's last point
+        assert series.shards[0] == (at(4).timestamp(), at(12).timestamp())
+        assert series.shards[-1][1] == at(150).timestamp()
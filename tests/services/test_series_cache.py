@@ -0,0 +1,62 @@
+from datetime import datetime, timezone
+from time import sleep
+
+from contxt.services.series_cache import TimeSeriesCache
+
+
+def points(start, end):
+    return [(datetime.fromtimestamp(t, timezone.utc), t % 7) for t in range(start, end)]
+
+
+def test_time_series_cache(tmp_path):
+    path = tmp_path / "series.db"
+    cache = TimeSeriesCache(path)
+    key = ("1", "temperature", 0, "")
+    assert cache.gaps(key, 100, 200) == [(100, 200)]
+    cache.put(key, 100, 150, points(100, 151))
+    cache.put(key, 170, 180, points(170, 180))
+    assert cache.gaps(key, 100, 200) == [(150, 170), (180, 200)]
+    assert cache.get(key, 140, 175) == points(140, 150) + points(170, 175)
+
+    # Overlapping ranges replace the points they cover
+    cache.put(key, 120, 175, [])
+    assert cache.gaps(key, 100, 200) == [(180, 200)]
+    assert cache.get(key, 100, 200) == points(100, 120) + points(175, 180)
+    cache.close()
+
+    # Persists, until cleared
+    cache = TimeSeriesCache(path)
+    assert cache.gaps(key, 100, 180) == []
+    assert cache.info() == (1, 0, 25)
+    cache.clear()
+    assert cache.gaps(key, 100, 180) == [(100, 180)]
+
+    # Ranges are only covered until they were fetched
+    now = int(datetime.now(timezone.utc).timestamp())
+    cache.put(key, now - 10, now + 10, points(now - 10, now + 10))
+    assert cache.gaps(key, now - 10, now + 10) == [(now, now + 10)]
+
+
+def test_time_series_cache_values():
+    cache = TimeSeriesCache()
+    key = ("1", "state", 0, "")
+    t = datetime(2021, 1, 1, tzinfo=timezone.utc)
+    values = [1, 1.5, True, "on", None, (1, 2), [1, 2], {"a": 1}, t]
+    series = [(datetime.fromtimestamp(i, timezone.utc), v) for i, v in enumerate(values)]
+
+    # Values are returned as parsed, without being converted to JSON
+    cache.put(key, 0, len(values), iter(series))
+    assert cache.get(key, 0, len(values)) == series
+
+
+def test_time_series_cache_eviction():
+    cache = TimeSeriesCache(retention=0.05, max_points=15)
+    cache.put(("1", "a", 0, ""), 0, 10, points(0, 10))
+    cache.put(("1", "b", 0, ""), 0, 10, points(0, 10))
+    assert cache.gaps(("1", "a", 0, ""), 0, 10) == [(0, 10)]
+    assert cache.get(("1", "b", 0, ""), 0, 10) == points(0, 10)
+
+    # Expires ranges after the retention
+    sleep(0.05)
+    assert cache.gaps(("1", "b", 0, ""), 0, 10) == [(0, 10)]
+    assert cache.info()[2] == 0
@@ -0,0 +1,40 @@
+import pytest
+
+from contxt.utils.collections import merge_series, merge_series_columns
+
+
+def series(keys, consumed=None):
+    for k in keys:
+        if consumed is not None:
+            consumed.append(k)
+        yield k, k * 10
+
+
+@pytest.mark.parametrize(
+    "fill,expected",
+    [
+        ("none", [{"a": 10}, {"a": 20, "b": 20}, {"b": 30}, {"a": 40}]),
+        ("value", [{"a": 10, "b": 0}, {"a": 20, "b": 20}, {"a": 0, "b": 30}, {"a": 40, "b": 0}]),
+        ("previous", [{"a": 10, "b": 0}, {"a": 20, "b": 20}, {"a": 20, "b": 30}, {"a": 40, "b": 30}]),
+    ],
+)
+def test_merge_series(fill, expected):
+    rows = merge_series({"a": series([1, 2, 4]), "b": series([2, 3])}, fill=fill, fill_value=0)
+    assert list(rows) == list(zip([1, 2, 3, 4], expected))
+
+
+def test_merge_series_lazy():
+    consumed = []
+    rows = merge_series(
+        {"a": series(range(0, 100, 2), consumed), "b": series(range(1, 100, 2), consumed)}
+    )
+    assert [k for k, _ in zip(rows, range(3))] == [(0, {"a": 0}), (1, {"b": 10}), (2, {"a": 20})]
+    assert len(consumed) <= 6
+
+
+def test_merge_series_columns():
+    chunks = merge_series_columns({"a": series([1, 2, 4]), "b": series([2, 3])}, size=3)
+    assert list(chunks) == [
+        {"timestamp": [1, 2, 3], "a": [10, 20, None], "b": [None, 20, 30]},
+        {"timestamp": [4], "a": [40], "b": [None]},
+    ]
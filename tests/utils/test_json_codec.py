@@ -0,0 +1,27 @@
+import pytest
+
+from contxt.utils.json_codec import JsonCodec, OrjsonCodec, UjsonCodec, default_codec
+
+
+def available_codecs():
+    codecs = [JsonCodec()]
+    for codec_cls in (OrjsonCodec, UjsonCodec):
+        try:
+            codecs.append(codec_cls())
+        except ImportError:
+            pass
+    return codecs
+
+
+@pytest.mark.parametrize("codec", available_codecs(), ids=lambda c: c.name)
+def test_round_trip(codec):
+    obj = {"records": [{"id": 1, "value": 1.5, "label": "ü"}, None, True], "total": 2 ** 40}
+    assert codec.loads(codec.dumps(obj)) == obj
+    assert codec.dumps(b'{"a": 1}') == b'{"a": 1}'
+    assert codec.loads(codec.dumps({1: 2})) == {"1": 2}
+    with pytest.raises(ValueError):
+        codec.loads(b"not json")
+
+
+def test_default_codec():
+    assert default_codec() is default_codec()
@@ -0,0 +1,31 @@
+import json
+
+import pytest
+
+from contxt.utils.json_stream import JsonRecordStream
+
+DOCS = [
+    {"records": [{"id": 1, "value": 12345.678}, {"id": 2, "value": "ü,]}"}], "_metadata": {"n": 2}},
+    {"_metadata": {"totalRecords": 3}, "records": [1, -20, 3e10, True, None, [1, [2]]]},
+    {"meta": {"next_page_url": None}, "records": []},
+    {"records": [[]], "other": {"records": [1]}},
+    {},
+]
+
+
+def chunked(raw: bytes, size: int):
+    return (raw[i : i + size] for i in range(0, len(raw), size))
+
+
+@pytest.mark.parametrize("doc", DOCS)
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 1024])
+def test_stream(doc, size):
+    raw = json.dumps(doc, indent=1, ensure_ascii=False).encode()
+    stream = JsonRecordStream(chunked(raw, size))
+    assert list(stream) == doc.get("records", [])
+    assert stream.metadata == {k: v for k, v in doc.items() if k != "records"}
+
+
+def test_truncated():
+    with pytest.raises(ValueError):
+        list(JsonRecordStream([b'{"records": [1, 2']))